@@ -0,0 +1,48 @@
+# benchmarks/bench_checksum.py
+"""Micro-benchmark de _make_packet/parse_packet para cada algoritmo de checksum.
+
+Uso: python benchmarks/bench_checksum.py [--iteracoes N] [--tamanhos 64,512,1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.checksum import CHECKSUM_IDS
+from network.rdt import RDT, LEGACY
+
+
+def medir(funcao, argumento, iteracoes):
+    """Pacotes por segundo de funcao(argumento)"""
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        funcao(argumento)
+    return iteracoes / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iteracoes", type=int, default=200_000)
+    parser.add_argument("--tamanhos", default="64,512,1000")
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    algoritmos = [LEGACY] + list(CHECKSUM_IDS)
+
+    print(f"{'checksum':<10} {'bytes':>6} {'_make_packet pkt/s':>20} {'parse_packet pkt/s':>20}")
+    for tamanho in tamanhos:
+        payload = os.urandom(tamanho)
+        for algoritmo in algoritmos:
+            rdt = RDT(None, ("127.0.0.1", 0), checksum=algoritmo)
+            pacote = rdt._make_packet(payload)
+            assert rdt.parse_packet(pacote)[2], f"checksum {algoritmo} não confere"
+
+            montagem = medir(rdt._make_packet, payload, args.iteracoes)
+            leitura = medir(rdt.parse_packet, pacote, args.iteracoes)
+            print(f"{algoritmo:<10} {tamanho:>6} {montagem:>20,.0f} {leitura:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bench_player_memory.py
+"""Memória ocupada por jogador (models.player.Player) com N jogadores.
+
+Uso: python benchmarks/bench_player_memory.py [--jogadores 100000]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.player import Player
+
+
+# Mesmo __init__, mas sem __slots__ (como o Player era antes), para comparação
+PlayerComDict = type("PlayerComDict", (), {"__init__": Player.__init__})
+
+
+def medir(classe, nomes, enderecos):
+    """Bytes alocados para criar um jogador de `classe` por nome (nomes/endereços já existem)"""
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    jogadores = [classe(pid, endereco, nome) for pid, (nome, endereco) in enumerate(zip(nomes, enderecos))]
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    # A lista em si não é do jogador
+    usado -= sys.getsizeof(jogadores)
+    return usado / len(jogadores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jogadores", type=int, default=100_000)
+    args = parser.parse_args()
+
+    nomes = [f"jogador{i}" for i in range(args.jogadores)]
+    enderecos = [("127.0.0.1", 10000 + i % 50000) for i in range(args.jogadores)]
+
+    print(f"{args.jogadores} jogadores (nome e endereço compartilhados com a conexão, fora da conta)")
+    print(f"{'representação':<16} {'bytes/jogador':>14} {'total (MiB)':>12}")
+    for rotulo, classe in (("__slots__", Player), ("__dict__", PlayerComDict)):
+        por_jogador = medir(classe, nomes, enderecos)
+        print(f"{rotulo:<16} {por_jogador:>14.1f} {por_jogador * args.jogadores / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# benchmarks/bench_rdt.py
+"""Vazão e latência do RDT (pares emissor/receptor em loopback) com perda simulada.
+
+Uso:
+  python benchmarks/bench_rdt.py                                   # matriz padrão
+  python benchmarks/bench_rdt.py --saida base.json                 # salva o resultado
+  python benchmarks/bench_rdt.py --baseline base.json              # compara (código 1 se piorou)
+  python benchmarks/bench_rdt.py --modos janela --tamanhos 64,8192 --perdas 0,0.05 --concorrencias 1,8
+
+Cada cenário (modo × tamanho × perda × concorrência) sobe `concorrência` pares de
+RDT, cada par com dois sockets UDP e duas threads, e manda `--mensagens` mensagens
+por par. A perda é sorteada em cada datagrama (dados e ACKs) pelo próprio
+benchmark, sem mexer em LOSS_PROBABILITY. Mede mensagens/s, goodput, latência de
+entrega (p50/p99, do send() até o recv() do outro lado) e retransmissões por mensagem.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.rdt import RDT, MODE_STOP_AND_WAIT, MODE_WINDOW
+
+_CARIMBO = struct.Struct("!d")  # instante do envio, no começo de cada mensagem
+
+# Métricas comparadas com o baseline: nome -> True se maior é melhor
+METRICAS = {
+    "mensagens_s": True,
+    "goodput_mb_s": True,
+    "latencia_p50_ms": False,
+    "latencia_p99_ms": False,
+    "retransmissoes_msg": False,
+}
+
+
+class _RDTComPerda(RDT):
+    """RDT que descarta cada datagrama enviado com probabilidade `perda`"""
+
+    def __init__(self, *args, perda=0.0, sorteio=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.perda = perda
+        self.sorteio = sorteio or random.Random()
+
+    def _sendto(self, packet):
+        if self.perda and self.sorteio.random() < self.perda:
+            return len(packet)
+        return super()._sendto(packet)
+
+
+def _socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def percentil(ordenados, fracao):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+class Par:
+    """Um emissor e um receptor RDT ligados por loopback"""
+
+    def __init__(self, modo, perda, semente):
+        self.sock_emissor = _socket()
+        self.sock_receptor = _socket()
+        addr_emissor = self.sock_emissor.getsockname()
+        addr_receptor = self.sock_receptor.getsockname()
+        self.emissor = _RDTComPerda(self.sock_emissor, addr_receptor, mode=modo,
+                                    perda=perda, sorteio=random.Random(semente))
+        self.receptor = _RDTComPerda(self.sock_receptor, addr_emissor, mode=modo,
+                                     perda=perda, sorteio=random.Random(semente + 1))
+        self.latencias = []
+        self.entregues = 0
+        self.erro = None
+        self._terminou = threading.Event()
+
+    def enviar(self, mensagens, tamanho):
+        enchimento = os.urandom(max(0, tamanho - _CARIMBO.size))
+        try:
+            for _ in range(mensagens):
+                self.emissor.send(_CARIMBO.pack(time.perf_counter()) + enchimento)
+            self.emissor.flush()
+        except Exception as e:
+            self.erro = e
+        finally:
+            self._terminou.set()
+
+    def receber(self):
+        # Continua atendendo até o emissor terminar: o último ACK também pode se perder
+        while not self._terminou.is_set():
+            self._contar(self.receptor.recv(timeout=0.05))
+        # O que já foi confirmado pode estar esperando em recv(): conta tudo
+        while self._contar(self.receptor.recv(timeout=0)):
+            pass
+
+    def _contar(self, mensagem):
+        if mensagem is None:
+            return False
+        self.latencias.append(time.perf_counter() - _CARIMBO.unpack_from(mensagem)[0])
+        self.entregues += 1
+        return True
+
+    def fechar(self):
+        self.sock_emissor.close()
+        self.sock_receptor.close()
+
+
+def executar_cenario(modo, tamanho, perda, concorrencia, mensagens, semente):
+    pares = [Par(modo, perda, semente + 2 * i) for i in range(concorrencia)]
+    threads = []
+    for par in pares:
+        threads.append(threading.Thread(target=par.receber, daemon=True))
+        threads.append(threading.Thread(target=par.enviar, args=(mensagens, tamanho), daemon=True))
+
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    for par in pares:
+        par.fechar()
+
+    latencias = sorted(latencia for par in pares for latencia in par.latencias)
+    entregues = sum(par.entregues for par in pares)
+    retransmissoes = sum(par.emissor.metricas.retransmissoes for par in pares)
+    return {
+        "modo": modo,
+        "tamanho": tamanho,
+        "perda": perda,
+        "concorrencia": concorrencia,
+        "mensagens": mensagens * concorrencia,
+        "entregues": entregues,
+        # Par que deu erro ou não entregou todas as mensagens
+        "falhas": sum(1 for par in pares if par.erro is not None or par.entregues != mensagens),
+        "duracao_s": round(duracao, 4),
+        "mensagens_s": round(entregues / duracao, 1),
+        "goodput_mb_s": round(entregues * tamanho / duracao / 1e6, 3),
+        "latencia_p50_ms": round(percentil(latencias, 0.50) * 1000, 3),
+        "latencia_p99_ms": round(percentil(latencias, 0.99) * 1000, 3),
+        "retransmissoes_msg": round(retransmissoes / max(1, entregues), 4),
+    }
+
+
+def mediana(execucoes):
+    """Junta repetições de um cenário: mediana de cada métrica e soma das falhas"""
+    cenario = dict(execucoes[0])
+    for metrica in ("duracao_s",) + tuple(METRICAS):
+        cenario[metrica] = statistics.median(execucao[metrica] for execucao in execucoes)
+    cenario["falhas"] = sum(execucao["falhas"] for execucao in execucoes)
+    cenario["repeticoes"] = len(execucoes)
+    return cenario
+
+
+def chave(cenario):
+    return cenario["modo"], cenario["tamanho"], cenario["perda"], cenario["concorrencia"]
+
+
+def comparar(resultados, baseline, tolerancia, folga_ms=1.0):
+    """Lista de (cenário, métrica, antes, depois) que pioraram mais que `tolerancia`.
+
+    Latências abaixo do milissegundo variam muito entre execuções; por isso uma
+    latência só conta como regressão se também piorou mais que `folga_ms`.
+    """
+    anteriores = {chave(c): c for c in baseline["cenarios"]}
+    regressoes = []
+    for cenario in resultados["cenarios"]:
+        anterior = anteriores.get(chave(cenario))
+        if anterior is None:
+            continue
+        for metrica, maior_melhor in METRICAS.items():
+            antes, depois = anterior.get(metrica), cenario[metrica]
+            if not antes:
+                continue
+            if metrica.endswith("_ms") and depois - antes <= folga_ms:
+                continue
+            variacao = (depois - antes) / antes
+            if (variacao < -tolerancia) if maior_melhor else (variacao > tolerancia):
+                regressoes.append((cenario, metrica, antes, depois))
+    return regressoes
+
+
+def imprimir(cenario):
+    print(f"{cenario['modo']:<14} {cenario['tamanho']:>6} {cenario['perda']:>6.2f} {cenario['concorrencia']:>5}"
+          f" {cenario['mensagens_s']:>10,.0f} {cenario['goodput_mb_s']:>9.3f}"
+          f" {cenario['latencia_p50_ms']:>9.2f} {cenario['latencia_p99_ms']:>9.2f}"
+          f" {cenario['retransmissoes_msg']:>8.3f}"
+          + (f"  ⚠️ {cenario['falhas']} par(es) falharam" if cenario["falhas"] else ""))
+
+
+def _lista(tipo):
+    return lambda texto: [tipo(item) for item in texto.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modos", type=_lista(str), default=[MODE_STOP_AND_WAIT, MODE_WINDOW])
+    parser.add_argument("--tamanhos", type=_lista(int), default=[64, 1000, 8192], help="bytes por mensagem")
+    parser.add_argument("--perdas", type=_lista(float), default=[0.0, 0.01, 0.05])
+    parser.add_argument("--concorrencias", type=_lista(int), default=[1, 4], help="pares simultâneos")
+    parser.add_argument("--mensagens", type=int, default=300, help="mensagens por par")
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções por cenário (usa a mediana)")
+    parser.add_argument("--semente", type=int, default=1, help="semente do sorteio de perdas")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="piora relativa aceita antes de acusar regressão (0.2 = 20%%)")
+    parser.add_argument("--folga-ms", type=float, default=1.0,
+                        help="piora mínima de latência (ms) para acusar regressão")
+    parser.add_argument("--verbose", action="store_true", help="mostra os logs do RDT")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    print(f"{'modo':<14} {'bytes':>6} {'perda':>6} {'pares':>5} {'msg/s':>10} {'MB/s':>9}"
+          f" {'p50 ms':>9} {'p99 ms':>9} {'retx/msg':>8}")
+    cenarios = []
+    for modo in args.modos:
+        for tamanho in args.tamanhos:
+            for perda in args.perdas:
+                for concorrencia in args.concorrencias:
+                    cenario = mediana([
+                        executar_cenario(modo, max(tamanho, _CARIMBO.size), perda,
+                                         concorrencia, args.mensagens, args.semente)
+                        for _ in range(args.repeticoes)
+                    ])
+                    imprimir(cenario)
+                    cenarios.append(cenario)
+
+    resultados = {
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "mensagens_por_par": args.mensagens,
+            "repeticoes": args.repeticoes,
+            "semente": args.semente,
+        },
+        "cenarios": cenarios,
+    }
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+    falhou = any(cenario["falhas"] for cenario in cenarios)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressoes = comparar(resultados, baseline, args.tolerancia, args.folga_ms)
+        if regressoes:
+            print(f"\n❌ {len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%} em relação a {args.baseline}:")
+            for cenario, metrica, antes, depois in regressoes:
+                modo, tamanho, perda, concorrencia = chave(cenario)
+                print(f"   {modo} {tamanho}B perda={perda} pares={concorrencia}: {metrica} {antes} → {depois}")
+            falhou = True
+        else:
+            print(f"\n✅ Sem regressões acima de {args.tolerancia:.0%} em relação a {args.baseline}")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
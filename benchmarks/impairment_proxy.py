@@ -0,0 +1,329 @@
+# benchmarks/impairment_proxy.py
+"""Proxy UDP que degrada o tráfego entre clientes e servidor: perda, atraso, jitter,
+reordenação, duplicação e corrupção, configuráveis por sentido.
+
+Uso:
+  python main.py server --contatos contatos_carga.txt
+  python benchmarks/impairment_proxy.py --porta 12346 --perda 0.05 --atraso 20 --jitter 10
+  python benchmarks/load_generator.py --bots 200 --porta 12346
+
+O servidor lê os contatos ao subir, então o contatos_carga.txt precisa existir antes
+(o load_generator gera o mesmo arquivo a cada execução com o mesmo --bots). Com um
+cliente de verdade, o servidor usa o contatos.txt:
+  python client_udp.py --port 5221 --name Alex --server 127.0.0.1:12346
+
+Cada opção vale para os dois sentidos; `--<opção>-ida` (cliente → servidor) e
+`--<opção>-volta` (servidor → cliente) sobrescrevem um deles. Tempos em ms.
+
+O servidor confere a porta do jogador no contatos.txt, então o proxy fala com ele
+de um socket na mesma porta do cliente, mas em outro IP de loopback (`--ip-saida`,
+padrão 127.0.0.2, que no Linux já existe). Nada disso passa pelo código do RDT.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import SERVER_HOST, SERVER_PORT
+
+DISTRIBUICOES = ("uniforme", "normal", "exponencial")
+ESPERA_REORDEM = 0.05  # segundos que um pacote retido espera, no máximo, pelos seguintes
+SESSAO_OCIOSA = 120.0  # segundos sem tráfego até o proxy fechar o socket de um cliente
+
+
+class Degradacao:
+    """Defeitos aplicados a um sentido do tráfego (probabilidades por datagrama, tempos em s)"""
+
+    def __init__(self, perda=0.0, atraso=0.0, jitter=0.0, distribuicao="uniforme", reordem=0.0,
+                 janela_reordem=3, duplicacao=0.0, corrupcao=0.0, sorteio=None):
+        if distribuicao not in DISTRIBUICOES:
+            raise ValueError(f"Distribuição de atraso inválida: {distribuicao}")
+        self.perda = perda
+        self.atraso = atraso
+        self.jitter = jitter
+        self.distribuicao = distribuicao
+        self.reordem = reordem
+        self.janela_reordem = janela_reordem
+        self.duplicacao = duplicacao
+        self.corrupcao = corrupcao
+        self.sorteio = sorteio or random.Random()
+
+    def sortear_atraso(self):
+        if not self.jitter:
+            return self.atraso
+        if self.distribuicao == "normal":
+            atraso = self.sorteio.gauss(self.atraso, self.jitter)
+        elif self.distribuicao == "exponencial":
+            # Cauda longa: a maioria perto do atraso base, alguns bem atrasados
+            atraso = self.atraso + self.sorteio.expovariate(1 / self.jitter)
+        else:
+            atraso = self.atraso + self.sorteio.uniform(-self.jitter, self.jitter)
+        return max(0.0, atraso)
+
+    def corromper(self, data):
+        """Inverte bits de um byte aleatório do datagrama"""
+        if not data:
+            return data
+        corrompido = bytearray(data)
+        corrompido[self.sorteio.randrange(len(corrompido))] ^= self.sorteio.randrange(1, 256)
+        return bytes(corrompido)
+
+    def descrever(self):
+        return (f"perda={self.perda:.0%} atraso={self.atraso * 1000:.0f}±{self.jitter * 1000:.0f}ms"
+                f" ({self.distribuicao}) reordem={self.reordem:.0%}/{self.janela_reordem}"
+                f" duplicação={self.duplicacao:.0%} corrupção={self.corrupcao:.0%}")
+
+
+class _Sentido:
+    """Aplica uma Degradacao aos datagramas de um sentido e conta o que aconteceu"""
+
+    CONTADORES = ("recebidos", "perdidos", "corrompidos", "duplicados", "reordenados", "entregues")
+
+    def __init__(self, degradacao, loop):
+        self.degradacao = degradacao
+        self.loop = loop
+        self.contadores = dict.fromkeys(self.CONTADORES, 0)
+        self._retidos = []  # [restantes, dados, enviar] esperando `janela_reordem` pacotes passarem
+
+    def encaminhar(self, data, enviar):
+        d = self.degradacao
+        self.contadores["recebidos"] += 1
+        if d.perda and d.sorteio.random() < d.perda:
+            self.contadores["perdidos"] += 1
+            return
+        if d.corrupcao and d.sorteio.random() < d.corrupcao:
+            self.contadores["corrompidos"] += 1
+            data = d.corromper(data)
+
+        copias = 1
+        if d.duplicacao and d.sorteio.random() < d.duplicacao:
+            self.contadores["duplicados"] += 1
+            copias = 2
+        for _ in range(copias):
+            if d.reordem and d.sorteio.random() < d.reordem:
+                self._reter(data, enviar)
+            else:
+                self._agendar(data, enviar)
+                self._passou_um()
+
+    def _agendar(self, data, enviar):
+        atraso = self.degradacao.sortear_atraso()
+        if atraso > 0:
+            self.loop.call_later(atraso, self._entregar, data, enviar)
+        else:
+            self._entregar(data, enviar)
+
+    def _entregar(self, data, enviar):
+        self.contadores["entregues"] += 1
+        try:
+            enviar(data)
+        except OSError:
+            pass  # destino fora do ar: para o RDT é só mais uma perda
+
+    def _reter(self, data, enviar):
+        """Segura o pacote até `janela_reordem` pacotes seguintes passarem na frente"""
+        self.contadores["reordenados"] += 1
+        retido = [self.degradacao.janela_reordem, data, enviar]
+        self._retidos.append(retido)
+        # Sem tráfego depois dele (stop-and-wait), sai mesmo assim
+        self.loop.call_later(ESPERA_REORDEM, self._liberar, retido)
+
+    def _passou_um(self):
+        for retido in list(self._retidos):
+            retido[0] -= 1
+            if retido[0] <= 0:
+                self._liberar(retido)
+
+    def _liberar(self, retido):
+        if retido in self._retidos:
+            self._retidos.remove(retido)
+            self._agendar(retido[1], retido[2])
+
+
+class _ProtocoloUDP(asyncio.DatagramProtocol):
+    def __init__(self, ao_receber):
+        self.ao_receber = ao_receber
+
+    def datagram_received(self, data, addr):
+        self.ao_receber(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+class _Sessao:
+    """Socket do proxy do lado do servidor para um cliente"""
+
+    def __init__(self):
+        self.transport = None      # None enquanto o socket abre
+        self.pendentes = []        # datagramas do cliente que chegaram antes disso
+        self.ultimo = time.monotonic()
+
+
+class ImpairmentProxy:
+    """Repassa datagramas cliente ↔ servidor aplicando uma Degradacao em cada sentido.
+
+    Cada cliente ganha um socket próprio do lado do servidor (uma "sessão"), para o
+    servidor continuar vendo um endereço por jogador.
+    """
+
+    def __init__(self, escuta, servidor, ida, volta, ip_saida="127.0.0.2", intervalo_relatorio=5.0):
+        self.escuta = escuta
+        self.servidor = servidor
+        self.ida = ida
+        self.volta = volta
+        self.ip_saida = ip_saida
+        self.intervalo_relatorio = intervalo_relatorio
+        self.loop = None
+        self.transport = None
+        self.sessoes = {}  # addr do cliente -> _Sessao
+        self.sentido_ida = None
+        self.sentido_volta = None
+
+    def run(self):
+        try:
+            asyncio.run(self._executar())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.sentido_ida is not None:
+                self._relatar()
+
+    async def _executar(self):
+        self.loop = asyncio.get_running_loop()
+        self.sentido_ida = _Sentido(self.ida, self.loop)
+        self.sentido_volta = _Sentido(self.volta, self.loop)
+        self.transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _ProtocoloUDP(self._do_cliente), local_addr=self.escuta
+        )
+        print(f"🌪️ Proxy em {self.escuta[0]}:{self.escuta[1]} → servidor {self.servidor[0]}:{self.servidor[1]}")
+        print(f"   ida:   {self.ida.descrever()}")
+        print(f"   volta: {self.volta.descrever()}")
+        try:
+            while True:
+                await asyncio.sleep(self.intervalo_relatorio)
+                self._fechar_ociosas()
+                self._relatar()
+        finally:
+            for sessao in self.sessoes.values():
+                if sessao.transport is not None:
+                    sessao.transport.close()
+            self.transport.close()
+
+    async def _abrir_sessao(self, addr, sessao):
+        def do_servidor(data, origem):
+            sessao.ultimo = time.monotonic()
+            self.sentido_volta.encaminhar(data, lambda d: self.transport.sendto(d, addr))
+
+        try:
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _ProtocoloUDP(do_servidor), local_addr=(self.ip_saida, addr[1])
+            )
+        except OSError as e:
+            # Sem o IP de saída (ou porta ocupada): o login por porta do servidor vai recusar
+            print(f"⚠️ Não foi possível usar {self.ip_saida}:{addr[1]} ({e}); usando porta aleatória")
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _ProtocoloUDP(do_servidor), local_addr=(self.escuta[0], 0)
+            )
+        return transport
+
+    def _do_cliente(self, data, addr):
+        sessao = self.sessoes.get(addr)
+        if sessao is None:
+            sessao = self.sessoes[addr] = _Sessao()
+            self.loop.create_task(self._iniciar_sessao(addr, sessao))
+        sessao.ultimo = time.monotonic()
+        if sessao.transport is None:
+            sessao.pendentes.append(data)
+            return
+        self.sentido_ida.encaminhar(data, lambda d: sessao.transport.sendto(d, self.servidor))
+
+    async def _iniciar_sessao(self, addr, sessao):
+        sessao.transport = await self._abrir_sessao(addr, sessao)
+        print(f"🔌 Sessão {addr[0]}:{addr[1]} ↔ {sessao.transport.get_extra_info('sockname')}")
+        pendentes, sessao.pendentes = sessao.pendentes, []
+        for data in pendentes:
+            self.sentido_ida.encaminhar(data, lambda d: sessao.transport.sendto(d, self.servidor))
+
+    def _fechar_ociosas(self):
+        limite = time.monotonic() - SESSAO_OCIOSA
+        for addr, sessao in list(self.sessoes.items()):
+            if sessao.transport is not None and sessao.ultimo < limite:
+                sessao.transport.close()
+                del self.sessoes[addr]
+
+    def _relatar(self):
+        for rotulo, sentido in (("ida", self.sentido_ida), ("volta", self.sentido_volta)):
+            c = sentido.contadores
+            print(f"📊 {rotulo:<5} recebidos={c['recebidos']} perdidos={c['perdidos']} "
+                  f"corrompidos={c['corrompidos']} duplicados={c['duplicados']} "
+                  f"reordenados={c['reordenados']} entregues={c['entregues']}")
+
+
+def _endereco(texto):
+    host, _, porta = texto.rpartition(":")
+    return host or "127.0.0.1", int(porta)
+
+
+def _adicionar_opcao(parser, nome, tipo, padrao, ajuda):
+    """--nome vale para os dois sentidos; --nome-ida e --nome-volta sobrescrevem"""
+    parser.add_argument(f"--{nome}", type=tipo, default=padrao, help=ajuda)
+    parser.add_argument(f"--{nome}-ida", type=tipo, default=None, help=argparse.SUPPRESS)
+    parser.add_argument(f"--{nome}-volta", type=tipo, default=None, help=argparse.SUPPRESS)
+
+
+def _degradacao(args, sentido, sorteio):
+    def valor(nome):
+        especifico = getattr(args, f"{nome}_{sentido}")
+        return getattr(args, nome) if especifico is None else especifico
+
+    return Degradacao(
+        perda=valor("perda"),
+        atraso=valor("atraso") / 1000,
+        jitter=valor("jitter") / 1000,
+        distribuicao=valor("distribuicao"),
+        reordem=valor("reordem"),
+        janela_reordem=valor("janela_reordem"),
+        duplicacao=valor("duplicacao"),
+        corrupcao=valor("corrupcao"),
+        sorteio=sorteio,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="Cada opção de degradação aceita também as formas -ida e -volta (ex.: --perda-volta 0.1).",
+    )
+    parser.add_argument("--porta", type=int, default=SERVER_PORT + 1, help="porta em que o proxy escuta")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--servidor", type=_endereco, default=(SERVER_HOST, SERVER_PORT), help="HOST:PORTA do servidor")
+    parser.add_argument("--ip-saida", default="127.0.0.2", help="IP de loopback usado para falar com o servidor")
+    _adicionar_opcao(parser, "perda", float, 0.0, "probabilidade de descartar o datagrama")
+    _adicionar_opcao(parser, "atraso", float, 0.0, "atraso base (ms)")
+    _adicionar_opcao(parser, "jitter", float, 0.0, "variação do atraso (ms)")
+    _adicionar_opcao(parser, "distribuicao", str, "uniforme", "distribuição do jitter: " + ", ".join(DISTRIBUICOES))
+    _adicionar_opcao(parser, "reordem", float, 0.0, "probabilidade de segurar o datagrama atrás dos seguintes")
+    _adicionar_opcao(parser, "janela-reordem", int, 3, "quantos datagramas passam na frente de um retido")
+    _adicionar_opcao(parser, "duplicacao", float, 0.0, "probabilidade de entregar o datagrama duas vezes")
+    _adicionar_opcao(parser, "corrupcao", float, 0.0, "probabilidade de inverter bits de um byte")
+    parser.add_argument("--semente", type=int, help="semente dos sorteios (reprodutível)")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="segundos entre os relatórios")
+    args = parser.parse_args()
+
+    sorteio = random.Random(args.semente)
+    try:
+        ida = _degradacao(args, "ida", sorteio)
+        volta = _degradacao(args, "volta", sorteio)
+    except ValueError as e:
+        parser.error(str(e))
+    ImpairmentProxy((args.host, args.porta), args.servidor, ida, volta,
+                    ip_saida=args.ip_saida, intervalo_relatorio=args.intervalo).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# benchmarks/load_generator.py
+"""Gerador de carga: milhares de jogadores-robô contra o servidor, num só processo.
+
+Uso:
+  python benchmarks/load_generator.py --bots 1000 --iniciar-servidor
+  python benchmarks/load_generator.py --bots 1000 --iniciar-servidor --args-servidor=--async
+  python benchmarks/load_generator.py --bots 1000 --contatos contatos_carga.txt   # servidor já rodando com
+                                                                                  # python main.py server --contatos contatos_carga.txt
+Cada robô tem sua porta e seu RDT (asyncio), faz login, joga `--rodadas` rodadas
+(comandos aleatórios ou `--script`) e sai. No fim mostra latência de login e de
+comando→resposta (percentis), retransmissões e erros.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from network import protocol
+from network.framing import desempacotar
+from network.rdt_async import AsyncRDT
+from utils.config import SERVER_HOST, SERVER_PORT
+
+COMANDOS_ALEATORIOS = ("move up", "move down", "move left", "move right", "hint", "suggest")
+_RODADA_TEXTO = re.compile(r"RODADA (\d+)")
+
+
+def gerar_contatos(arquivo, bots, porta_base, host="127.0.0.1"):
+    """Escreve o arquivo de contatos com os robôs (bot0, bot1, ...) e retorna [(nome, porta)]"""
+    robos = [(f"bot{i}", porta_base + i) for i in range(bots)]
+    with open(arquivo, "w") as f:
+        for nome, porta in robos:
+            f.write(f"{nome};{host}:{porta}\n")
+    return robos
+
+
+def percentis(valores):
+    """p50/p90/p99/máximo em milissegundos"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+
+    def p(fracao):
+        return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))] * 1000
+
+    return p(0.50), p(0.90), p(0.99), ordenados[-1] * 1000
+
+
+class Estatisticas:
+    def __init__(self):
+        self.latencias_login = []
+        self.latencias_comando = []
+        self.erros = Counter()
+        self.rodadas = 0
+        self.logouts = 0
+        self.retransmissoes = 0
+
+
+class _ProtocoloRobo(asyncio.DatagramProtocol):
+    def __init__(self, robo):
+        self.robo = robo
+
+    def datagram_received(self, data, addr):
+        self.robo.ao_receber(data)
+
+    def error_received(self, exc):
+        # ICMP "port unreachable": servidor fora do ar; o RDT segue retransmitindo
+        pass
+
+
+class Robo:
+    """Um jogador sem terminal: fala o protocolo binário (ou texto) e responde a cada SUA VEZ"""
+
+    def __init__(self, nome, porta, args, estatisticas):
+        self.nome = nome
+        self.porta = porta
+        self.args = args
+        self.estatisticas = estatisticas
+        self.rdt = None
+        self.transport = None
+        self.online = None      # Future resolvido com a resposta do login
+        self.vezes = None       # asyncio.Queue com os números das rodadas em que é a vez do robô
+        self.resposta = None    # Future do comando aguardando resposta
+        self._script = 0
+
+    async def conectar(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ProtocoloRobo(self), local_addr=("127.0.0.1", self.porta)
+        )
+        self.rdt = AsyncRDT(self.transport, (self.args.host, self.args.porta))
+        self.online = loop.create_future()
+        self.vezes = asyncio.Queue()
+
+    def ao_receber(self, data):
+        try:
+            mensagens = self.rdt.process_packet(data)
+        except Exception:
+            self.estatisticas.erros["pacote inválido"] += 1
+            return
+        for mensagem in mensagens:
+            for dado in desempacotar(mensagem):
+                self._tratar(dado)
+
+    def _tratar(self, dado):
+        if protocol.is_binario(dado):
+            try:
+                opcode, campos = protocol.decodificar(dado)
+            except ValueError:
+                self.estatisticas.erros["mensagem inválida"] += 1
+                return
+            if opcode == protocol.OP_SUA_VEZ:
+                self.vezes.put_nowait(campos[0])
+            return
+
+        texto = dado.decode("utf-8", errors="ignore")
+        if "SUA VEZ" in texto:
+            # Cliente de texto: o número da rodada vem no próprio texto
+            numero = _RODADA_TEXTO.search(texto)
+            self.vezes.put_nowait(int(numero.group(1)) if numero else 0)
+            return
+        if not self.online.done():
+            self.online.set_result(texto)
+            return
+        # Avisos do servidor para todos começam com quebra de linha; o resto é resposta a comando
+        if texto.startswith(("\n", "🚪", "[Servidor]", "🏆")):
+            return
+        if self.resposta is not None and not self.resposta.done():
+            self.resposta.set_result(texto)
+
+    def _codificar(self, texto):
+        if self.args.texto:
+            return texto.encode()
+        return protocol.codificar_texto(texto) or texto.encode()
+
+    def _proximo_comando(self):
+        if self.args.script:
+            comando = self.args.script[self._script % len(self.args.script)]
+            self._script += 1
+            return comando
+        return random.choice(COMANDOS_ALEATORIOS)
+
+    async def _proxima_vez(self):
+        """Espera a vez do robô; se várias rodadas se acumularam, fica com a mais recente"""
+        numero = await asyncio.wait_for(self.vezes.get(), self.args.timeout)
+        while not self.vezes.empty():
+            numero = self.vezes.get_nowait()
+        return numero
+
+    async def login(self):
+        inicio = time.perf_counter()
+        try:
+            await self.rdt.enviar(self._codificar(f"login {self.nome}"))
+            resposta = await asyncio.wait_for(self.online, self.args.timeout)
+        except asyncio.TimeoutError:
+            self.estatisticas.erros["login sem resposta"] += 1
+            return False
+        except Exception:
+            self.estatisticas.erros["login: envio falhou"] += 1
+            return False
+        if "online" not in resposta:
+            self.estatisticas.erros["login recusado"] += 1
+            return False
+        self.estatisticas.latencias_login.append(time.perf_counter() - inicio)
+        return True
+
+    async def jogar(self):
+        for _ in range(self.args.rodadas):
+            try:
+                await self._proxima_vez()
+            except asyncio.TimeoutError:
+                self.estatisticas.erros["rodada não começou"] += 1
+                return
+            if self.args.pensar:
+                await asyncio.sleep(random.uniform(0, self.args.pensar))
+
+            self.resposta = asyncio.get_running_loop().create_future()
+            inicio = time.perf_counter()
+            try:
+                await self.rdt.enviar(self._codificar(self._proximo_comando()))
+                await asyncio.wait_for(self.resposta, self.args.timeout)
+            except asyncio.TimeoutError:
+                self.estatisticas.erros["comando sem resposta"] += 1
+                continue
+            except Exception:
+                self.estatisticas.erros["comando: envio falhou"] += 1
+                return
+            self.estatisticas.latencias_comando.append(time.perf_counter() - inicio)
+            self.estatisticas.rodadas += 1
+
+    async def sair(self):
+        # Espera a resposta do logout antes de fechar a porta: o servidor só
+        # remove o jogador depois que ela é confirmada
+        self.resposta = asyncio.get_running_loop().create_future()
+        try:
+            await self.rdt.enviar(self._codificar("logout"))
+            await asyncio.wait_for(self.resposta, self.args.timeout)
+            self.estatisticas.logouts += 1
+        except asyncio.TimeoutError:
+            self.estatisticas.erros["logout sem resposta"] += 1
+        except Exception:
+            self.estatisticas.erros["logout: envio falhou"] += 1
+
+    def fechar(self):
+        if self.rdt is not None:
+            self.estatisticas.retransmissoes += self.rdt.metricas.retransmissoes
+            self.rdt.fechar()
+        if self.transport is not None:
+            self.transport.close()
+
+    async def executar(self):
+        try:
+            await self.conectar()
+            if await self.login():
+                await self.jogar()
+                await self.sair()
+        except OSError:
+            self.estatisticas.erros["porta indisponível"] += 1
+        finally:
+            self.fechar()
+
+
+async def executar_robos(robos, args, estatisticas):
+    tarefas = []
+    for nome, porta in robos:
+        tarefas.append(asyncio.create_task(Robo(nome, porta, args, estatisticas).executar()))
+        if args.intervalo_login:
+            await asyncio.sleep(args.intervalo_login)
+    await asyncio.gather(*tarefas)
+
+
+def relatorio(estatisticas, robos, duracao):
+    print(f"\n📊 {len(robos)} robôs em {duracao:.1f}s")
+    print(f"   logins: {len(estatisticas.latencias_login)} | rodadas jogadas: {estatisticas.rodadas}"
+          f" | logouts: {estatisticas.logouts} | retransmissões: {estatisticas.retransmissoes}")
+    print(f"   {'latência (ms)':<22} {'p50':>8} {'p90':>8} {'p99':>8} {'máx':>8}")
+    for rotulo, valores in (("login", estatisticas.latencias_login),
+                            ("comando → resposta", estatisticas.latencias_comando)):
+        resultado = percentis(valores)
+        if resultado is None:
+            print(f"   {rotulo:<22} {'-':>8}")
+        else:
+            print(f"   {rotulo:<22} " + " ".join(f"{v:>8.1f}" for v in resultado))
+    if estatisticas.erros:
+        print("   erros:")
+        for erro, quantidade in estatisticas.erros.most_common():
+            print(f"     {erro}: {quantidade}")
+    else:
+        print("   erros: nenhum")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--rodadas", type=int, default=5, help="comandos por robô")
+    parser.add_argument("--porta-base", type=int, default=20000, help="porta do primeiro robô")
+    parser.add_argument("--contatos", default="contatos_carga.txt", help="arquivo de contatos gerado")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--porta", type=int, default=SERVER_PORT, help="porta do servidor")
+    parser.add_argument("--script", type=lambda s: [c.strip() for c in s.split(",") if c.strip()],
+                        help='comandos em sequência, ex.: "move up,move right,hint" (padrão: aleatórios)')
+    parser.add_argument("--texto", action="store_true", help="usa o protocolo de texto em vez do binário")
+    parser.add_argument("--pensar", type=float, default=0.0, help="espera aleatória máxima antes de cada comando (s)")
+    parser.add_argument("--intervalo-login", type=float, default=0.001, help="intervalo entre os logins (s)")
+    parser.add_argument("--timeout", type=float, default=45.0,
+                        help="espera máxima por resposta ou rodada (s); cobre a pausa de 30s após uma vitória")
+    parser.add_argument("--iniciar-servidor", action="store_true",
+                        help="sobe python main.py server com o arquivo de contatos gerado")
+    parser.add_argument("--args-servidor", default="", help='argumentos extras do servidor, ex.: --args-servidor="--async --workers 4"')
+    parser.add_argument("--verbose", action="store_true", help="mostra os logs do RDT")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    robos = gerar_contatos(args.contatos, args.bots, args.porta_base)
+    print(f"📋 {len(robos)} robôs cadastrados em {args.contatos}")
+
+    servidor = None
+    if args.iniciar_servidor:
+        comando = [sys.executable, os.path.join(RAIZ, "main.py"), "server", "--contatos",
+                   os.path.abspath(args.contatos)] + args.args_servidor.split()
+        servidor = subprocess.Popen(comando, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(1.0)
+
+    estatisticas = Estatisticas()
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(executar_robos(robos, args, estatisticas))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompido")
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait(timeout=5)
+    relatorio(estatisticas, robos, time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    main()
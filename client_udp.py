@@ -5,8 +5,11 @@ import threading
 import queue
 import sys
 import re
+from collections import deque
 from network import RDT
-from utils.config import SERVER_HOST, SERVER_PORT
+from network.framing import desempacotar
+from network import protocol
+from utils.config import SERVER_HOST, SERVER_PORT, MESSAGE_PROTOCOL, HEARTBEAT_INTERVAL, LOG_FORMAT
 
 import logging
 logging.getLogger().setLevel(logging.WARNING)
@@ -19,16 +22,24 @@ except Exception:
     pass
 
 class UDPClient:
-    def __init__(self, client_port, nome=None):
+    def __init__(self, client_port, nome=None, sala=None, servidor=None):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.bind(('127.0.0.1', client_port))
         self.rdt = None
-        self.server_addr = (SERVER_HOST, SERVER_PORT)
+        # servidor: (host, porta) de outro destino, ex.: benchmarks/impairment_proxy.py
+        self.server_addr = servidor or (SERVER_HOST, SERVER_PORT)
         self.nome = nome
+        self.sala = sala  # sala escolhida no login (None: o servidor escolhe)
         self.rdt_lock = threading.Lock()
         self.last_round_shown = None
         
         self.message_queue = queue.Queue()
+        self.pendentes = deque()  # mensagens de um lote já recebido ainda não entregues
+        self.binario = MESSAGE_PROTOCOL == "binario"
+        # Estado do jogo montado a partir dos deltas do servidor
+        self.estado = {}  # nome -> (x, y, hint_used, suggest_used, score)
+        self.versao_estado = 0
+        self.ultimo_heartbeat = 0.0
         self.receiving_thread = None
         self.receiving_active = False
     
@@ -38,10 +49,14 @@ class UDPClient:
     
     def enviar(self, mensagem):
         """Envia mensagem usando RDT"""
+        dados = protocol.codificar_texto(mensagem) if self.binario else None
+        return self._enviar_dados(dados or mensagem.encode())
+    
+    def _enviar_dados(self, dados):
         if self.rdt:
             try:
                 with self.rdt_lock:
-                    self.rdt.send(mensagem.encode())
+                    self.rdt.send(dados)
                 return True
             except Exception as e:
                 print(f"❌ Erro ao enviar: {e}")
@@ -53,35 +68,23 @@ class UDPClient:
         while self.receiving_active:
             try:
                 if self.rdt:
-                    with self.rdt_lock:
-                        data = self.rdt.recv(timeout=0.3)
+                    data = self._proximo_dado(timeout=0.3)
                     if data:
-                        if len(data) == 1:
+                        mensagem, round_num, tipo = self._classificar(data)
+                        if mensagem is None:
                             continue
-                        mensagem = data.decode()
-                        msg_lower = mensagem.lower()
-                        round_match = re.search(r'rodada\s+(\d+)', msg_lower)
-                        if round_match:
-                            round_num = int(round_match.group(1))
+                        if round_num is not None:
                             if round_num == self.last_round_shown:
                                 continue
                             self.last_round_shown = round_num
                         self.message_queue.put(mensagem)
 
                         try:
-                            is_broadcast = (
-                                ("rodada" in msg_lower and "iniciada" in msg_lower) or
-                                ("tempo esgotado" in msg_lower) or
-                                ("estado atual" in msg_lower) or
-                                ("jogadores sem ação" in msg_lower) or
-                                ("vencedor" in msg_lower) or
-                                ("encontrou o tesouro" in msg_lower)
-                            )
-                            if is_broadcast:
+                            if tipo:
                                 sep = "\n" + "="*60
-                                if "rodada" in msg_lower and "iniciada" in msg_lower:
+                                if tipo == "rodada":
                                     print(f"{sep}\n{mensagem}\nComandos: move up | move down | move left | move right | hint | suggest | logout\n" + "="*60)
-                                elif ("vencedor" in msg_lower) or ("encontrou o tesouro" in msg_lower):
+                                elif tipo == "vitoria":
                                     print(f"{sep}\n🏆 {mensagem}\n" + "="*60)
                                 else:
                                     print(f"{sep}\n{mensagem}\n" + "="*60)
@@ -95,14 +98,100 @@ class UDPClient:
                     logging.debug(f"Erro na thread de recepção: {e}")
                 break
     
+    def _classificar(self, data):
+        """Retorna (texto, número da rodada ou None, tipo de aviso ou None).
+
+        Mensagens binárias são classificadas pelo opcode; as de texto, pelo conteúdo.
+        """
+        if protocol.is_binario(data):
+            opcode, campos = protocol.decodificar(data)
+            mensagem = self._texto_binario(opcode, campos, data)
+            if opcode in (protocol.OP_RODADA, protocol.OP_SUA_VEZ):
+                return mensagem, campos[0], "rodada"
+            if opcode == protocol.OP_VITORIA:
+                return mensagem, None, "vitoria"
+            if opcode in (protocol.OP_ESTADO, protocol.OP_DELTA, protocol.OP_SNAPSHOT,
+                          protocol.OP_SEM_ACAO, protocol.OP_TEMPO_ESGOTADO):
+                return mensagem, None, "aviso"
+            return mensagem, None, None
+
+        mensagem = data.decode()
+        msg_lower = mensagem.lower()
+        round_match = re.search(r'rodada\s+(\d+)', msg_lower)
+        round_num = int(round_match.group(1)) if round_match else None
+        if "rodada" in msg_lower and "iniciada" in msg_lower:
+            tipo = "rodada"
+        elif ("vencedor" in msg_lower) or ("encontrou o tesouro" in msg_lower):
+            tipo = "vitoria"
+        elif (
+            ("tempo esgotado" in msg_lower) or
+            ("estado atual" in msg_lower) or
+            ("jogadores sem ação" in msg_lower)
+        ):
+            tipo = "aviso"
+        else:
+            tipo = None
+        return mensagem, round_num, tipo
+    
+    def _texto_binario(self, opcode, campos, data):
+        """Texto de uma mensagem binária; deltas/snapshots atualizam o estado local.
+
+        Retorna None para um delta que não se aplica à versão local (pede resync).
+        """
+        if opcode == protocol.OP_SNAPSHOT:
+            self.versao_estado, jogadores = campos
+            self.estado = {j[0]: j[1:] for j in jogadores}
+        elif opcode == protocol.OP_DELTA:
+            base, versao, jogadores, removidos = campos
+            if base != self.versao_estado:
+                self._enviar_dados(protocol.comando("resync"))
+                return None
+            for j in jogadores:
+                self.estado[j[0]] = j[1:]
+            for nome in removidos:
+                self.estado.pop(nome, None)
+            self.versao_estado = versao
+        else:
+            return protocol.renderizar(data)
+        return protocol.texto_estado([(nome,) + campos for nome, campos in self.estado.items()])
+    
+    def _proximo_dado(self, timeout=None):
+        """Próxima mensagem do servidor (bytes), desempacotando os lotes (datagramas com várias mensagens).
+
+        Enquanto espera, manda heartbeat quando passa HEARTBEAT_INTERVAL sem trocar
+        pacotes com o servidor, para ele saber que o cliente continua vivo (com
+        tráfego, os próprios dados e ACKs já mostram isso).
+        """
+        limite = None if timeout is None else time.time() + timeout
+        while not self.pendentes:
+            espera = HEARTBEAT_INTERVAL
+            if limite is not None:
+                espera = min(espera, max(0.0, limite - time.time()))
+            with self.rdt_lock:
+                # rdt.last_active: último pacote válido do servidor (respondido com ACK
+                # ou confirmando um envio nosso)
+                if time.time() - max(self.ultimo_heartbeat, self.rdt.last_active) >= HEARTBEAT_INTERVAL:
+                    self.rdt.heartbeat()
+                    self.ultimo_heartbeat = time.time()
+                data = self.rdt.recv(timeout=espera)
+            if data and len(data) > 1:
+                self.pendentes.extend(desempacotar(data))
+            elif limite is not None and time.time() >= limite:
+                return None
+        return self.pendentes.popleft()
+    
+    def _proxima_mensagem(self, timeout=None):
+        """Próxima mensagem do servidor já como texto"""
+        data = self._proximo_dado(timeout=timeout)
+        if data is None:
+            return None
+        return self._classificar(data)[0]
+    
     def receber(self, timeout=None):
         """Recebe mensagem usando RDT"""
         if self.rdt:
             try:
-                data = self.rdt.recv(timeout=timeout)
-                if data:
-                    return data.decode()
-                return None
+                return self._proxima_mensagem(timeout=timeout)
             except socket.timeout:
                 return None
             except Exception as e:
@@ -138,7 +227,8 @@ class UDPClient:
             
             try:
                 # Enviar login usando RDT
-                if not self.enviar(f"login {self.nome}"):
+                login = f"login {self.nome} {self.sala}" if self.sala else f"login {self.nome}"
+                if not self.enviar(login):
                     print("❌ Falha ao enviar login")
                     continue
     
@@ -266,14 +356,24 @@ class UDPClient:
         self.receiving_active = False
         if self.receiving_thread and self.receiving_thread.is_alive():
             self.receiving_thread.join(timeout=1)
+        
+        # No modo janela o logout pode ainda estar em voo
+        try:
+            with self.rdt_lock:
+                self.rdt.flush()
+        except Exception:
+            pass
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
     import sys as _sys
     args = _sys.argv[1:]
     porta = None
     nome_cli = None
+    sala_cli = None
+    servidor_cli = None
     if args:
-        # Aceita: python client_udp.py --port 5000 --name teste1
+        # Aceita: python client_udp.py --port 5000 --name teste1 [--room sala] [--server host:porta]
         if "--port" in args:
             try:
                 porta = int(args[args.index("--port") + 1])
@@ -284,6 +384,18 @@ if __name__ == "__main__":
                 nome_cli = args[args.index("--name") + 1]
             except Exception:
                 nome_cli = None
+        if "--room" in args:
+            try:
+                sala_cli = args[args.index("--room") + 1]
+            except Exception:
+                sala_cli = None
+        if "--server" in args:
+            try:
+                host, _, porta_servidor = args[args.index("--server") + 1].rpartition(":")
+                servidor_cli = (host or SERVER_HOST, int(porta_servidor))
+            except Exception:
+                print("❌ Servidor inválido, use host:porta")
+                exit(1)
     if porta is None:
         try:
             porta = int(input("Digite sua porta (ex: 5001, 5002, etc): "))
@@ -291,5 +403,5 @@ if __name__ == "__main__":
             print("❌ Porta inválida")
             exit(1)
     
-    client = UDPClient(porta, nome=nome_cli)
+    client = UDPClient(porta, nome=nome_cli, sala=sala_cli, servidor=servidor_cli)
     client.run()
\ No newline at end of file
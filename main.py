@@ -1,4 +1,5 @@
 # main.py
+import logging
 import sys
 
 try:
@@ -8,16 +9,63 @@ except Exception:
     pass
 from server_udp import UDPServer
 from client_udp import UDPClient
+from utils.config import STATS_PORT, LOG_FORMAT, UDP_IO
 
 def main():
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
     if len(sys.argv) < 2:
-        print("Uso: python main.py [server|client]")
+        print("Uso: python main.py [server [--async] [--workers N] [--contatos ARQUIVO] [--stats PORTA] [--io simples|lote]|client]")
         return
     
     mode = sys.argv[1].lower()
     
     if mode == "server":
-        server = UDPServer()
+        args = sys.argv[2:]
+        workers = 1
+        if "--workers" in args:
+            try:
+                workers = int(args[args.index("--workers") + 1])
+            except (IndexError, ValueError):
+                print("❌ Número de workers inválido")
+                return
+        contatos = "contatos.txt"
+        if "--contatos" in args:
+            try:
+                contatos = args[args.index("--contatos") + 1]
+            except IndexError:
+                print("❌ Informe o arquivo de contatos")
+                return
+        stats_porta = STATS_PORT
+        if "--stats" in args:
+            try:
+                stats_porta = int(args[args.index("--stats") + 1])
+            except (IndexError, ValueError):
+                print("❌ Porta de métricas inválida")
+                return
+        io = UDP_IO
+        if "--io" in args:
+            try:
+                io = args[args.index("--io") + 1]
+            except IndexError:
+                io = None
+            if io not in ("simples", "lote"):
+                print("❌ E/S inválida. Use: --io simples ou --io lote")
+                return
+        
+        if workers > 1:
+            from server_workers import MultiWorkerServer
+            if MultiWorkerServer.suportado():
+                MultiWorkerServer(
+                    workers, assincrono="--async" in args, contatos=contatos, stats_porta=stats_porta, io=io
+                ).run()
+                return
+            print("⚠️ --workers precisa do SO_REUSEPORT do Linux; usando um único processo")
+        
+        if "--async" in args:
+            from server_async import AsyncUDPServer
+            server = AsyncUDPServer(contatos=contatos, stats_porta=stats_porta)
+        else:
+            server = UDPServer(contatos=contatos, stats_porta=stats_porta, io=io)
         server.run()
     elif mode == "client":
         try:
@@ -1,46 +1,224 @@
 # models/game.py
 import random
+from array import array
+from utils.config import GRID_WIDTH, GRID_HEIGHT
+from utils.positions_utils import humano_para_interno, interno_para_humano
 
-def humano_para_interno(x, y):
-    """Converte coordenadas humanas (x,y) para internas (i,j)"""
-    # (1,1) → (2,0)
-    # (1,2) → (1,0)
-    # (1,3) → (0,0)
-    # (3,3) → (0,2)
-    return (3 - y, x - 1)
-
-def interno_para_humano(i, j):
-    """Converte coordenadas internas (i,j) para humanas (x,y)"""
-    # (0,0) → (1,3)
-    # (2,0) → (1,1)
-    # (0,2) → (3,3)
-    return (j + 1, 3 - i)
+try:
+    import numpy as np
+except ImportError:  # opcional: sem NumPy a resolução em lote usa um laço simples
+    np = None
+
+# Deslocamento (di, dj) de cada movimento em coordenadas internas
+MOVIMENTOS = {
+    "move up": (-1, 0),
+    "move down": (1, 0),
+    "move left": (0, -1),
+    "move right": (0, 1),
+}
+_COMANDOS_MOVIMENTO = tuple(MOVIMENTOS)  # código da direção (campo do tesouro) -> comando
+_DICAS = {
+    "move up": "O tesouro está mais acima.",
+    "move down": "O tesouro está mais abaixo.",
+    "move left": "O tesouro está mais à esquerda.",
+    "move right": "O tesouro está mais à direita.",
+}
+if np is not None:
+    _CODIGOS = {comando: codigo for codigo, comando in enumerate(MOVIMENTOS)}
+    _DELTAS = np.array(list(MOVIMENTOS.values()), dtype=np.int64)  # linha = código do comando
 
 class Game:
-    def __init__(self):
+    def __init__(self, largura=GRID_WIDTH, altura=GRID_HEIGHT):
+        if largura < 1 or altura < 1 or largura * altura < 2:
+            raise ValueError(f"Grid inválido: {largura}x{altura}")
+        self.largura = largura  # colunas
+        self.altura = altura    # linhas
         self.jogadores = []
-        self.mapa = [[0,0,0],
-                     [0,0,0],
-                     [0,0,0]]
-        self.tesouro = self.spawn()
+        self.por_nome = {}  # nome -> Player
+        # Ocupação: quantos jogadores há em cada casa, linha a linha (i * largura + j)
+        self.mapa = array('I', [0]) * (largura * altura)
+        self.tesouro = self.spawn()  # também monta self._campo (ver _calcular_campo)
+
+    def para_interno(self, x, y):
+        return humano_para_interno(x, y, self.altura)
+
+    def para_humano(self, pos):
+        """Posição interna (i, j) em coordenadas humanas (x, y)"""
+        return interno_para_humano(pos[0], pos[1], self.altura)
+
+    def dentro(self, i, j):
+        return 0 <= i < self.altura and 0 <= j < self.largura
+
+    def ocupacao(self, pos):
+        """Quantos jogadores estão na casa interna `pos`"""
+        i, j = pos
+        return self.mapa[i * self.largura + j]
+
+    def _ocupar(self, pos, delta):
+        i, j = pos
+        self.mapa[i * self.largura + j] += delta
+
+    def _mover(self, player, novo):
+        self._ocupar(player.pos, -1)
+        player.pos = novo
+        self._ocupar(novo, 1)
 
     def spawn(self):
-        """Sorteia tesouro em qualquer posição exceto (1,1)"""
+        """Sorteia tesouro em qualquer posição exceto (1,1) e já monta o campo de
+        distâncias até ele, para a primeira dica não pagar a BFS"""
         while True:
-            x = random.randint(1,3)
-            y = random.randint(1,3)
+            x = random.randint(1, self.largura)
+            y = random.randint(1, self.altura)
             if (x,y) != (1,1):  # Não pode ser na posição inicial
-                return humano_para_interno(x, y)
+                break
+        self.tesouro = self.para_interno(x, y)
+        self._campo = self._calcular_campo()
+        return self.tesouro
+
+    def _calcular_campo(self):
+        """(distância, direção, casas) de cada casa (índice i * largura + j) até o tesouro.
+
+        Feito por BFS a partir do tesouro a cada spawn. direção é o código (em
+        MOVIMENTOS) do próximo passo pelo caminho mais curto, preferindo andar na
+        vertical; casas é quantos passos seguidos nessa direção o caminho dá.
+        """
+        return self._campo_numpy() if np is not None else self._campo_bfs()
+
+    def _campo_bfs(self):
+        """Campo do tesouro com uma BFS em Python puro (sem NumPy)"""
+        largura, altura = self.largura, self.altura
+        total = largura * altura
+        ti, tj = self.tesouro
+        origem = ti * largura + tj
+        distancia = array('i', [-1]) * total
+        distancia[origem] = 0
+        ordem = [origem]  # casas em ordem de distância (a lista é a própria fila da BFS)
+        for casa in ordem:
+            i, j = divmod(casa, largura)
+            d = distancia[casa] + 1
+            if i > 0 and distancia[casa - largura] < 0:
+                distancia[casa - largura] = d
+                ordem.append(casa - largura)
+            if i < altura - 1 and distancia[casa + largura] < 0:
+                distancia[casa + largura] = d
+                ordem.append(casa + largura)
+            if j > 0 and distancia[casa - 1] < 0:
+                distancia[casa - 1] = d
+                ordem.append(casa - 1)
+            if j < largura - 1 and distancia[casa + 1] < 0:
+                distancia[casa + 1] = d
+                ordem.append(casa + 1)
+
+        # Direção e casas seguidas: a casa seguinte está mais perto, então já foi calculada
+        direcao = array('b', [-1]) * total
+        casas = array('I', [0]) * total
+        cima, baixo, esquerda, direita = (
+            _COMANDOS_MOVIMENTO.index(c) for c in ("move up", "move down", "move left", "move right")
+        )
+        for casa in ordem[1:]:
+            i, j = divmod(casa, largura)
+            anterior = distancia[casa] - 1
+            if i > 0 and distancia[casa - largura] == anterior:
+                codigo, seguinte = cima, casa - largura
+            elif i < altura - 1 and distancia[casa + largura] == anterior:
+                codigo, seguinte = baixo, casa + largura
+            elif j > 0 and distancia[casa - 1] == anterior:
+                codigo, seguinte = esquerda, casa - 1
+            else:
+                codigo, seguinte = direita, casa + 1
+            direcao[casa] = codigo
+            casas[casa] = casas[seguinte] + 1 if direcao[seguinte] == codigo else 1
+
+        return distancia, direcao, casas
+
+    def _campo_numpy(self):
+        """Mesmo campo de _campo_bfs, com a BFS feita por níveis (uma fronteira inteira por vez)"""
+        largura, altura = self.largura, self.altura
+        total = largura * altura
+        ti, tj = self.tesouro
+        distancia = np.full(total, -1, dtype='i')
+        fronteira = np.array([ti * largura + tj], dtype=np.int64)
+        distancia[fronteira] = 0
+        dono = np.zeros(total, dtype=np.int64)  # rascunho para tirar repetidas da fronteira
+        niveis = []
+        d = 0
+        while fronteira.size:
+            d += 1
+            i, j = np.divmod(fronteira, largura)
+            vizinhas = np.concatenate((
+                fronteira[i > 0] - largura,
+                fronteira[i < altura - 1] + largura,
+                fronteira[j > 0] - 1,
+                fronteira[j < largura - 1] + 1,
+            ))
+            vizinhas = vizinhas[distancia[vizinhas] < 0]
+            # Duas casas da fronteira podem ter a mesma vizinha: fica uma cópia só
+            indices = np.arange(vizinhas.size)
+            dono[vizinhas] = indices
+            vizinhas = vizinhas[dono[vizinhas] == indices]
+            distancia[vizinhas] = d
+            if vizinhas.size:
+                niveis.append(vizinhas)
+            fronteira = vizinhas
+
+        # Direção com a mesma preferência da versão em Python (vertical primeiro)
+        direcao = np.full(total, -1, dtype='b')
+        seguinte = np.zeros(total, dtype=np.int64)
+        casa = np.arange(total)
+        i, j = np.divmod(casa, largura)
+        alvo = distancia - 1
+        for comando in ("move up", "move down", "move left", "move right"):
+            di, dj = MOVIMENTOS[comando]
+            valida = (0 <= i + di) & (i + di < altura) & (0 <= j + dj) & (j + dj < largura)
+            vizinha = np.where(valida, casa + di * largura + dj, 0)
+            escolher = valida & (direcao < 0) & (alvo >= 0) & (distancia[vizinha] == alvo)
+            direcao[escolher] = _COMANDOS_MOVIMENTO.index(comando)
+            seguinte[escolher] = vizinha[escolher]
+
+        # Casas seguidas na mesma direção, nível por nível (o seguinte está no nível anterior)
+        casas = np.zeros(total, dtype='I')
+        for nivel in niveis:
+            prox = seguinte[nivel]
+            mesma = direcao[prox] == direcao[nivel]
+            casas[nivel] = np.where(mesma, casas[prox] + 1, 1)
+
+        return (
+            array('i', distancia.tobytes()),
+            array('b', direcao.tobytes()),
+            array('I', casas.tobytes()),
+        )
+
+    def proximo_passo(self, pos):
+        """(comando, casas seguidas nessa direção, distância até o tesouro) a partir de `pos`;
+        None se `pos` é o tesouro"""
+        distancia, direcao, casas = self._campo
+        casa = pos[0] * self.largura + pos[1]
+        if direcao[casa] < 0:
+            return None
+        return _COMANDOS_MOVIMENTO[direcao[casa]], casas[casa], distancia[casa]
 
     def add_player(self, player):
         """Adiciona jogador na posição inicial (1,1)"""
         player.reset_for_new_game()
-        player.pos = humano_para_interno(1, 1)  # (1,1) em coordenadas humanas
+        player.pos = self.para_interno(1, 1)  # (1,1) em coordenadas humanas
+        self._ocupar(player.pos, 1)
         self.jogadores.append(player)
+        self.por_nome[player.nome] = player
+
+    def get_jogador(self, nome):
+        """Retorna o jogador pelo nome (ou None)"""
+        return self.por_nome.get(nome)
+
+    def remover_jogador(self, nome):
+        """Remove o jogador da partida"""
+        player = self.por_nome.pop(nome, None)
+        if player is not None:
+            self._ocupar(player.pos, -1)
+            self.jogadores = [p for p in self.jogadores if p.nome != nome]
 
     def gerar_mapa(self):
         """Gera representação do mapa"""
-        mapa = [["." for _ in range(3)] for __ in range(3)]
+        mapa = [["."] * self.largura for _ in range(self.altura)]
 
         # Marcar tesouro
         ti, tj = self.tesouro
@@ -55,6 +233,80 @@ class Game:
 
         return mapa
 
+    def resolver_movimentos(self, movimentos):
+        """Aplica de uma vez os movimentos de uma rodada.
+
+        movimentos: [(player, comando)] na ordem de chegada, um por jogador.
+        Retorna (vencedor ou None, [(player, resposta)]). Se vários chegam ao
+        tesouro na mesma rodada, vence quem mandou o comando primeiro.
+        """
+        if not movimentos:
+            return None, []
+        if np is not None:
+            destinos, validos = self._destinos_numpy(movimentos)
+        else:
+            destinos, validos = self._destinos(movimentos)
+
+        vencedor = None
+        respostas = []
+        for (player, _), destino, valido in zip(movimentos, destinos, validos):
+            if not valido:
+                respostas.append((player, "Movimento inválido. Fora do grid."))
+                continue
+            player.pos = destino
+            if destino != self.tesouro:
+                x, y = self.para_humano(destino)
+                respostas.append((player, f"Movimento realizado. Nova posição: ({x},{y})"))
+            elif vencedor is None:
+                vencedor = player
+                tx, ty = self.para_humano(self.tesouro)
+                respostas.append((player, f"O jogador {player.nome} encontrou o tesouro na posição ({tx},{ty})!"))
+            else:
+                respostas.append((player, f"Você também chegou ao tesouro, mas {vencedor.nome} chegou primeiro."))
+        return vencedor, respostas
+
+    def _destinos(self, movimentos):
+        """Destinos e validade de cada movimento, atualizando a ocupação (sem NumPy)"""
+        destinos = []
+        validos = []
+        for player, comando in movimentos:
+            di, dj = MOVIMENTOS[comando]
+            i, j = player.pos
+            ni, nj = i + di, j + dj
+            if self.dentro(ni, nj):
+                self._ocupar((i, j), -1)
+                self._ocupar((ni, nj), 1)
+                destinos.append((ni, nj))
+                validos.append(True)
+            else:
+                destinos.append((i, j))
+                validos.append(False)
+        return destinos, validos
+
+    def _destinos_numpy(self, movimentos):
+        """Mesmo que _destinos, com as posições em arrays (linhas, colunas) e uma passada vetorizada"""
+        n = len(movimentos)
+        linhas = np.fromiter((p.pos[0] for p, _ in movimentos), dtype=np.int64, count=n)
+        colunas = np.fromiter((p.pos[1] for p, _ in movimentos), dtype=np.int64, count=n)
+        deltas = _DELTAS[np.array([_CODIGOS[c] for _, c in movimentos], dtype=np.intp)]
+
+        novas_linhas = linhas + deltas[:, 0]
+        novas_colunas = colunas + deltas[:, 1]
+        validos = (
+            (novas_linhas >= 0) & (novas_linhas < self.altura)
+            & (novas_colunas >= 0) & (novas_colunas < self.largura)
+        )
+        novas_linhas = np.where(validos, novas_linhas, linhas)
+        novas_colunas = np.where(validos, novas_colunas, colunas)
+
+        # Ocupação atualizada direto no buffer do array (sem cópia)
+        ocupacao = np.frombuffer(self.mapa, dtype=self.mapa.typecode)
+        np.subtract.at(ocupacao, (linhas * self.largura + colunas)[validos], 1)
+        np.add.at(ocupacao, (novas_linhas * self.largura + novas_colunas)[validos], 1)
+        del ocupacao
+
+        return list(zip(novas_linhas.tolist(), novas_colunas.tolist())), validos.tolist()
+
     def comando(self, player, comando):
         """Processa comando do jogador"""
         i, j = player.pos
@@ -79,21 +331,12 @@ class Game:
                 return False, "Você já usou sua dica."
             player.hint_used = True
 
-            px, py = player.pos
-            tx, ty = self.tesouro
-
-            if px == tx and py == ty:
+            passo = self.proximo_passo(player.pos)
+            if passo is None:
                 return False, "Você está no tesouro!"
 
             # Dica de direção
-            if tx < px:
-                return False, "O tesouro está mais acima."
-            elif tx > px:
-                return False, "O tesouro está mais abaixo."
-            elif ty > py:
-                return False, "O tesouro está mais à direita."
-            else:
-                return False, "O tesouro está mais à esquerda."
+            return False, _DICAS[passo[0]]
 
         # =====================
         #       SUGGEST
@@ -103,25 +346,13 @@ class Game:
                 return False, "Você já usou sua sugestão."
             player.suggest_used = True
 
-            px, py = player.pos
-            tx, ty = self.tesouro
-
-            if px == tx and py == ty:
+            passo = self.proximo_passo(player.pos)
+            if passo is None:
                 return False, "Você está no tesouro!"
 
-            # Calcula direção principal
-            if tx < px:  # Tesouro está acima
-                casas = px - tx
-                return False, f"Sugestão: move up {casas} casa{'s' if casas > 1 else ''}."
-            elif tx > px:  # Tesouro está abaixo
-                casas = tx - px
-                return False, f"Sugestão: move down {casas} casa{'s' if casas > 1 else ''}."
-            elif ty > py:  # Tesouro está à direita
-                casas = ty - py
-                return False, f"Sugestão: move right {casas} casa{'s' if casas > 1 else ''}."
-            else:  # Tesouro está à esquerda
-                casas = py - ty
-                return False, f"Sugestão: move left {casas} casa{'s' if casas > 1 else ''}."
+            # Direção principal e quantas casas seguir nela
+            direcao, casas, _ = passo
+            return False, f"Sugestão: {direcao} {casas} casa{'s' if casas > 1 else ''}."
 
         # =====================
         #   PROCESSAR MOVIMENTO
@@ -130,13 +361,13 @@ class Game:
             ni, nj = novo
 
             # Verificar limites do grid
-            if 0 <= ni < 3 and 0 <= nj < 3:
-                player.pos = (ni, nj)
+            if self.dentro(ni, nj):
+                self._mover(player, (ni, nj))
                 # Converter para coordenadas humanas para mensagem
-                x, y = interno_para_humano(ni, nj)
+                x, y = self.para_humano(player.pos)
                 
                 if player.pos == self.tesouro:
-                    tx, ty = interno_para_humano(*self.tesouro)
+                    tx, ty = self.para_humano(self.tesouro)
                     return True, f"O jogador {player.nome} encontrou o tesouro na posição ({tx},{ty})!"
                 
                 return False, f"Movimento realizado. Nova posição: ({x},{y})"
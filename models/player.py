@@ -1,5 +1,10 @@
 # models/player.py
+
 class Player:
+    # Sem __dict__ por instância: cada jogador ocupa só os campos abaixo
+    # (benchmarks/bench_player_memory.py mede os bytes por jogador)
+    __slots__ = ("pid", "addr", "nome", "pos", "hint_used", "suggest_used", "score")
+
     def __init__(self, pid, addr, nome):
         self.pid = pid
         self.addr = addr  # (ip, porta)
@@ -17,12 +22,6 @@ class Player:
             "suggest_used": self.suggest_used
         }
     
-    def get_human_position(self):
-        """Converte posição interna para coordenadas humanas (x, y)"""
-        # Assumindo que pos é (i, j) onde i é linha, j é coluna
-        i, j = self.pos
-        return (j + 1, 3 - i)  # Adaptar conforme necessário
-
     def reset_for_new_game(self):
         """Reseta estado transient para novo jogo mantendo pontuação."""
         self.pos = (1, 1)
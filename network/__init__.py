@@ -1,5 +1,6 @@
 # network/__init__.py
 from .rdt import RDT
 from .connection_manager import ConnectionManager
+from .demultiplexer import PacketDemultiplexer
 
-__all__ = ['RDT', 'ConnectionManager']
\ No newline at end of file
+__all__ = ['RDT', 'ConnectionManager', 'PacketDemultiplexer']
\ No newline at end of file
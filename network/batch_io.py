@@ -0,0 +1,237 @@
+# network/batch_io.py
+"""E/S de datagramas em lote: várias mensagens por chamada de sistema.
+
+No Linux usa recvmmsg/sendmmsg (via ctypes); nos outros sistemas, ou se a libc
+não tiver as funções, cai para um laço de recvfrom/sendto com a mesma interface.
+
+- BatchSender imita sock.sendto(): só enfileira. descarregar() manda tudo de uma vez
+  (o RDT chama antes de esperar um ACK e o servidor uma vez por iteração do loop).
+- BatchReceiver.receber(timeout) espera o primeiro datagrama e devolve todos os
+  que já chegaram, até `tamanho_lote` por chamada.
+"""
+import ctypes
+import ctypes.util
+import errno
+import select
+import socket
+import struct
+import sys
+from utils.config import BUFFER_SIZE
+
+_MAX_VLEN = 1024  # UIO_MAXIOV: limite de mensagens por chamada
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_Iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _Msghdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockaddrIn(ctypes.Structure):
+    # Porta e endereço já em ordem de rede
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_ubyte * 2),
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_ubyte * 8),
+    ]
+
+
+def _carregar_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        # O vetor de mmsghdr vai como endereço, para poder começar no meio do vetor
+        libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _carregar_libc()
+
+
+def mmsg_disponivel():
+    """Indica se recvmmsg/sendmmsg podem ser usados neste sistema"""
+    return _libc is not None
+
+
+def _usar_mmsg(sock, usar_mmsg):
+    if usar_mmsg is None:
+        usar_mmsg = mmsg_disponivel()
+    if usar_mmsg and not mmsg_disponivel():
+        raise OSError("recvmmsg/sendmmsg não disponíveis neste sistema")
+    return usar_mmsg and sock.family == socket.AF_INET
+
+
+class BatchSender:
+    """Fila de saída de um socket UDP, enviada com sendmmsg (ou um sendto por datagrama)"""
+
+    def __init__(self, sock, usar_mmsg=None):
+        self.sock = sock
+        self.mmsg = _usar_mmsg(sock, usar_mmsg)
+        self._fila = []
+        self._enderecos = {}  # addr -> _SockaddrIn já montado
+        self.chamadas = 0     # chamadas de sistema feitas
+        self.datagramas = 0   # datagramas enviados
+
+    def sendto(self, data, addr):
+        self._fila.append((data, addr))
+        return len(data)
+
+    def pendentes(self):
+        return len(self._fila)
+
+    def descarregar(self):
+        """Envia tudo que está na fila. Datagramas que o kernel recusa são descartados
+        (para o RDT é uma perda como outra qualquer)."""
+        if not self._fila:
+            return
+        fila, self._fila = self._fila, []
+        if self.mmsg:
+            for inicio in range(0, len(fila), _MAX_VLEN):
+                self._sendmmsg(fila[inicio:inicio + _MAX_VLEN])
+            return
+        for data, addr in fila:
+            self.chamadas += 1
+            try:
+                self.sock.sendto(data, addr)
+                self.datagramas += 1
+            except OSError:
+                pass
+
+    def _sockaddr(self, addr):
+        sockaddr = self._enderecos.get(addr)
+        if sockaddr is None:
+            sockaddr = _SockaddrIn()
+            sockaddr.sin_family = socket.AF_INET
+            sockaddr.sin_port[:] = struct.pack("!H", addr[1])
+            sockaddr.sin_addr[:] = socket.inet_aton(addr[0])
+            self._enderecos[addr] = sockaddr
+        return sockaddr
+
+    def _sendmmsg(self, fila):
+        quantidade = len(fila)
+        mensagens = (_Mmsghdr * quantidade)()
+        iovecs = (_Iovec * quantidade)()
+        dados = [bytes(data) for data, _ in fila]  # mantém os buffers vivos durante a chamada
+        tamanho_sockaddr = ctypes.sizeof(_SockaddrIn)
+        for i, (data, (_, addr)) in enumerate(zip(dados, fila)):
+            iovecs[i].iov_base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+            iovecs[i].iov_len = len(data)
+            cabecalho = mensagens[i].msg_hdr
+            cabecalho.msg_name = ctypes.addressof(self._sockaddr(addr))
+            cabecalho.msg_namelen = tamanho_sockaddr
+            cabecalho.msg_iov = ctypes.pointer(iovecs[i])
+            cabecalho.msg_iovlen = 1
+
+        fd = self.sock.fileno()
+        inicio = ctypes.addressof(mensagens)
+        enviados = 0
+        while enviados < quantidade:
+            self.chamadas += 1
+            resultado = _libc.sendmmsg(fd, inicio + enviados * ctypes.sizeof(_Mmsghdr), quantidade - enviados, 0)
+            if resultado >= 0:
+                enviados += resultado
+                self.datagramas += resultado
+                continue
+            erro = ctypes.get_errno()
+            if erro in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS):
+                # Buffer do socket cheio: espera abrir espaço
+                select.select([], [self.sock], [], 0.01)
+            elif erro != errno.EINTR:
+                enviados += 1  # o primeiro da vez foi recusado; segue com os outros
+
+
+class BatchReceiver:
+    """Leitura de um socket UDP em lotes, com recvmmsg (ou recvfrom enquanto houver datagrama)"""
+
+    def __init__(self, sock, tamanho_lote=64, usar_mmsg=None):
+        self.sock = sock
+        self.tamanho_lote = min(tamanho_lote, _MAX_VLEN)
+        self.mmsg = _usar_mmsg(sock, usar_mmsg)
+        self.chamadas = 0
+        self.datagramas = 0
+        if self.mmsg:
+            self._preparar_buffers()
+
+    def _preparar_buffers(self):
+        n = self.tamanho_lote
+        self._buffers = [ctypes.create_string_buffer(BUFFER_SIZE) for _ in range(n)]
+        self._origens = (_SockaddrIn * n)()
+        self._iovecs = (_Iovec * n)()
+        self._mensagens = (_Mmsghdr * n)()
+        for i, buffer in enumerate(self._buffers):
+            self._iovecs[i].iov_base = ctypes.addressof(buffer)
+            self._iovecs[i].iov_len = BUFFER_SIZE
+            cabecalho = self._mensagens[i].msg_hdr
+            cabecalho.msg_name = ctypes.addressof(self._origens[i])
+            cabecalho.msg_iov = ctypes.pointer(self._iovecs[i])
+            cabecalho.msg_iovlen = 1
+
+    def receber(self, timeout=None):
+        """Espera até `timeout` segundos pelo primeiro datagrama e retorna [(data, addr)]
+        com tudo que já estava no socket (lista vazia no timeout)"""
+        pronto, _, _ = select.select([self.sock], [], [], timeout)
+        if not pronto:
+            return []
+        if self.mmsg:
+            return self._recvmmsg()
+        return self._recvfrom()
+
+    def _recvmmsg(self):
+        tamanho_sockaddr = ctypes.sizeof(_SockaddrIn)
+        for i in range(self.tamanho_lote):
+            self._mensagens[i].msg_hdr.msg_namelen = tamanho_sockaddr
+        self.chamadas += 1
+        quantidade = _libc.recvmmsg(
+            self.sock.fileno(), ctypes.addressof(self._mensagens), self.tamanho_lote, _MSG_DONTWAIT, None
+        )
+        if quantidade < 0:
+            erro = ctypes.get_errno()
+            if erro in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(erro, "recvmmsg falhou")
+
+        recebidos = []
+        for i in range(quantidade):
+            origem = self._origens[i]
+            addr = (socket.inet_ntoa(bytes(origem.sin_addr)), (origem.sin_port[0] << 8) | origem.sin_port[1])
+            recebidos.append((ctypes.string_at(self._buffers[i], self._mensagens[i].msg_len), addr))
+        self.datagramas += quantidade
+        return recebidos
+
+    def _recvfrom(self):
+        # Com timeout no socket o CPython espera o socket ficar legível antes de cada
+        # recvfrom (mesmo com MSG_DONTWAIT); por isso só lê de novo depois de um
+        # select sem espera confirmar que há outro datagrama
+        recebidos = []
+        while len(recebidos) < self.tamanho_lote:
+            self.chamadas += 1
+            try:
+                recebidos.append(self.sock.recvfrom(BUFFER_SIZE))
+            except (BlockingIOError, InterruptedError, socket.timeout):
+                break
+            self.chamadas += 1
+            pronto, _, _ = select.select([self.sock], [], [], 0)
+            if not pronto:
+                break
+        self.datagramas += len(recebidos)
+        return recebidos
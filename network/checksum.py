@@ -0,0 +1,43 @@
+# network/checksum.py
+import hashlib
+import zlib
+
+# Estratégias de checksum do RDT. O id vai no cabeçalho de cada pacote
+# (4 bits), então o receptor sempre sabe qual algoritmo verificar.
+# Todas recebem (cabeçalho, dados) para não concatenar os bytes do pacote.
+
+
+def md5(header, data):
+    """MD5 truncado em 4 bytes (algoritmo original do protocolo)"""
+    h = hashlib.md5(header)
+    h.update(data)
+    return h.digest()[:4]
+
+
+def crc32(header, data):
+    return zlib.crc32(data, zlib.crc32(header)).to_bytes(4, 'big')
+
+
+def adler32(header, data):
+    return zlib.adler32(data, zlib.adler32(header)).to_bytes(4, 'big')
+
+
+CHECKSUM_IDS = {
+    "md5": 0,
+    "crc32": 1,
+    "adler32": 2,
+}
+
+CHECKSUMS = {
+    0: md5,
+    1: crc32,
+    2: adler32,
+}
+
+
+def get_checksum_id(nome):
+    """Id do algoritmo pelo nome; levanta ValueError para nomes desconhecidos"""
+    try:
+        return CHECKSUM_IDS[nome]
+    except KeyError:
+        raise ValueError(f"Checksum desconhecido: {nome} (use {', '.join(CHECKSUM_IDS)})")
@@ -1,12 +1,31 @@
 # network/connection_manager.py
 import time
 import os
+from contextlib import contextmanager
+from .rdt import send_batch
+from .metrics import MetricasConexoes
+from .framing import empacotar
+from .protocol import renderizar
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, fan_out=None, despedida=None, ao_falhar=None):
         self.connections = {}  # nome -> {'rdt': RDT, 'addr': addr, 'player': Player}
+        self.por_addr = {}     # addr -> nome (índice para o despacho de cada datagrama)
         self.online = {}
         self.contatos = {}
+        # fan_out({rdt: [dados, ...]}) -> {rdt: None | exceção}; o servidor asyncio troca por send_batch_async
+        self.fan_out = fan_out or send_batch
+        # despedida({rdt: [dados, ...]}): envio para peers que não são (ou deixaram de ser)
+        # jogadores, como logout e login recusado; o servidor síncrono troca por um envio
+        # que não espera o ACK, para um cliente que sumiu não travar o loop
+        self.despedida = despedida or self.fan_out
+        # ao_falhar(nome, addr): jogador cuja entrega falhou de vez; o servidor passa o
+        # próprio _desconectar, que tira o jogador da sala antes de remover a conexão
+        self.ao_falhar = ao_falhar
+        self._lote = None  # nome -> [mensagens] enquanto um lote (tick) está aberto
+        self._entregas_lote = None  # resultados do lote aberto (o dict produzido por lote())
+        self._lote_avulso = {}  # rdt -> [mensagens] de peers sem conexão, no mesmo lote
+        self.metricas = MetricasConexoes()
     
     def carregar_contatos(self, arquivo="contatos.txt"):
         """Carrega contatos do arquivo"""
@@ -47,21 +66,28 @@ class ConnectionManager:
         
         return True, "Login válido"
     
-    def adicionar_conexao(self, nome, addr, rdt, player):
-        """Adiciona uma nova conexão"""
+    def adicionar_conexao(self, nome, addr, rdt, player, binario=False):
+        """Adiciona uma nova conexão (binario: cliente fala o protocolo binário)"""
+        anterior = self.connections.get(nome)
+        if anterior:
+            self.por_addr.pop(anterior['addr'], None)
         self.connections[nome] = {
             'rdt': rdt,
             'addr': addr,
             'player': player,
-            'last_active': time.time()
+            'binario': binario,
         }
         self.online[nome] = addr
+        self.por_addr[addr] = nome
         print(f"✅ {nome} conectado de {addr} (PID: {player.pid})")
     
     def remover_conexao(self, nome):
-        """Remove uma conexão"""
+        """Remove uma conexão (o que já estava no lote para o jogador ainda é enviado)"""
         if nome in self.connections:
-            del self.connections[nome]
+            conn = self.connections.pop(nome)
+            self.por_addr.pop(conn['addr'], None)
+            if self._lote and nome in self._lote:
+                self._lote_avulso.setdefault(conn['rdt'], []).extend(self._lote.pop(nome))
         if nome in self.online:
             del self.online[nome]
         print(f"❌ {nome} desconectado")
@@ -80,29 +106,172 @@ class ConnectionManager:
     
     def get_jogador_por_addr(self, addr):
         """Retorna jogador pelo endereço - MÉTODO QUE FALTAVA"""
-        for nome, conn in self.connections.items():
-            if conn['addr'] == addr:
-                return nome, conn
-        return None, None
+        nome = self.por_addr.get(addr)
+        if nome is None:
+            return None, None
+        return nome, self.connections[nome]
+    
+    def inativos(self, limite):
+        """[(nome, addr)] dos jogadores cujo RDT está sem sinal há mais de `limite` segundos
+        (o instante do último pacote válido fica em rdt.last_active)"""
+        return [
+            (nome, conn['addr'])
+            for nome, conn in self.connections.items()
+            if conn['rdt'].is_inativo(limite)
+        ]
+    
+    def is_addr_conectado(self, addr):
+        """Verifica se o endereço pertence a um jogador conectado"""
+        return addr in self.por_addr
     
     def get_qtd_jogadores(self):
         """Retorna quantidade de jogadores conectados - MÉTODO QUE FALTAVA"""
         return len(self.connections)
     
-    def broadcast(self, mensagem, excluir=None):
-        """Envia mensagem para todos os jogadores conectados - MÉTODO QUE FALTAVA"""
-        for nome, conn in self.connections.items():
-            if excluir and nome == excluir:
-                continue
+    @contextmanager
+    def lote(self):
+        """Agrupa as mensagens de um tick do servidor.
+
+        Tudo que for enviado (broadcast/enviar) dentro do bloco é guardado por
+        jogador e sai no fim, empacotado no menor número de datagramas.
+        Produz um dict que, ao sair do bloco, tem {nome: True/False} com o
+        resultado da entrega de cada jogador (como o retorno de broadcast).
+        """
+        if self._lote is not None:
+            yield self._entregas_lote  # já dentro de um lote
+            return
+        self._lote = {}
+        self._entregas_lote = entregas = {}
+        try:
+            yield entregas
+        finally:
             try:
-                conn['rdt'].send(mensagem.encode())
-            except ConnectionResetError as e:
-                # Cliente caiu; remover para não travar envios
-                print(f"❌ Broadcast falhou para {nome} (conexão resetada). Removendo jogador.")
-                try:
-                    # remover_jogador pode depender do service, então aqui removemos conexão básica
-                    self.remover_conexao(nome)
-                except Exception:
-                    pass
-            except Exception as e:
-                print(f"❌ Erro enviando broadcast para {nome}: {e}")
\ No newline at end of file
+                # Desconectar quem falhou avisa a sala, o que enfileira mais mensagens
+                while self._lote or self._lote_avulso:
+                    entregas.update(self.enviar_lote())
+            finally:
+                self._lote = None
+                self._entregas_lote = None
+
+    def enviar_lote(self):
+        """Envia agora as mensagens acumuladas no lote aberto (o lote continua aberto)
+        e retorna {nome: True/False} como broadcast"""
+        if self._lote_avulso:
+            avulsos, self._lote_avulso = self._lote_avulso, {}
+            self.despedida({rdt: self._empacotar(rdt, dados) for rdt, dados in avulsos.items()})
+        if not self._lote:
+            return {}
+        mensagens, self._lote = self._lote, {}
+        return self._entregar(mensagens)
+
+    def _codificar(self, conn, mensagem):
+        """Texto vai como está; mensagem binária (network.protocol) vira texto
+        para clientes que não falam o protocolo binário"""
+        if isinstance(mensagem, str):
+            return mensagem.encode()
+        if conn.get('binario'):
+            return mensagem
+        return renderizar(mensagem).encode()
+
+    def enviar(self, nome, mensagem):
+        """Envia mensagem para um jogador (com lote aberto, só enfileira)"""
+        conn = self.connections.get(nome)
+        if self._lote is not None:
+            if conn:
+                self._lote.setdefault(nome, []).append(self._codificar(conn, mensagem))
+            return True
+        if not conn:
+            return False
+        self.metricas.mensagens_enviadas += 1
+        self.metricas.envios_diretos += 1
+        conn['rdt'].send(self._codificar(conn, mensagem))
+        return True
+
+    def enviar_avulso(self, rdt, mensagem, binario=False):
+        """Envia mensagem para um peer que não é jogador conectado (ex.: login recusado),
+        pelo envio de despedida (com lote aberto, só enfileira)"""
+        data = self._codificar({'binario': binario}, mensagem)
+        if self._lote is not None:
+            self._lote_avulso.setdefault(rdt, []).append(data)
+            return
+        self.despedida({rdt: self._empacotar(rdt, [data])})
+    
+    def broadcast(self, mensagem, excluir=None, nomes=None):
+        """Envia mensagem (texto ou network.protocol) para todos os jogadores conectados de uma só vez
+        (ou só para `nomes`, os membros de uma sala).
+
+        Os pacotes vão para a rede juntos e os ACKs são aguardados em paralelo,
+        então a latência é de ~1 RTT independente do número de jogadores.
+        Retorna {nome: True/False} com o resultado da entrega de cada um
+        (no servidor asyncio, o future do envio que ainda está em andamento;
+        com lote aberto, True indica que a mensagem foi enfileirada).
+        """
+        if nomes is None:
+            alvos = self.connections.items()
+        else:
+            alvos = ((nome, self.connections.get(nome)) for nome in nomes)
+        destinos = {
+            nome: self._codificar(conn, mensagem)
+            for nome, conn in alvos
+            if conn is not None and not (excluir and nome == excluir)
+        }
+        if self._lote is not None:
+            for nome, data in destinos.items():
+                self._lote.setdefault(nome, []).append(data)
+            return {nome: True for nome in destinos}
+        return self._entregar({nome: [data] for nome, data in destinos.items()})
+
+    def _empacotar(self, rdt, dados):
+        # Peers no formato legado recebem uma mensagem por datagrama
+        return dados if rdt.legacy else empacotar(dados)
+    
+    def _entregar(self, mensagens):
+        """Fan-out de {nome: [bytes, ...]}: agrupa as mensagens de cada jogador em
+        lotes (peers no formato legado recebem uma por datagrama)"""
+        destinos = {}
+        envios = {}
+        quantidade = 0
+        for nome, dados in mensagens.items():
+            conn = self.connections.get(nome)
+            if not conn:
+                continue
+            rdt = conn['rdt']
+            destinos[rdt] = nome
+            envios[rdt] = self._empacotar(rdt, dados)
+            quantidade += len(dados)
+        metricas = self.metricas
+        inicio = time.perf_counter()
+        resultados = self.fan_out(envios)
+        metricas.bloqueio_fan_out.observar(time.perf_counter() - inicio)
+        metricas.fan_outs += 1
+        metricas.mensagens_enviadas += quantidade
+        metricas.mensagens_por_fan_out.observar(quantidade)
+        
+        entregas = {}
+        falhas = []
+        for rdt, nome in destinos.items():
+            erro = resultados.get(rdt)
+            if not isinstance(erro, Exception):
+                entregas[nome] = True if erro is None else erro
+                continue
+            entregas[nome] = False
+            metricas.falhas_entrega += 1
+            # send_batch só desiste depois de esgotar as retransmissões (ou com o peer
+            # calado): o cliente caiu, e mantê-lo travaria os próximos envios
+            print(f"❌ Broadcast falhou para {nome}: {erro}. Removendo jogador.")
+            falhas.append(nome)
+        for nome in falhas:
+            self._remover_por_falha(nome)
+        return entregas
+
+    def _remover_por_falha(self, nome):
+        conn = self.connections.get(nome)
+        if conn is None:
+            return  # já saiu (ex.: removido pela falha de outro envio)
+        try:
+            if self.ao_falhar is None:
+                self.remover_conexao(nome)
+            else:
+                self.ao_falhar(nome, conn['addr'])
+        except Exception as e:
+            print(f"❌ Erro removendo {nome}: {e}")
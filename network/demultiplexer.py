@@ -0,0 +1,126 @@
+# network/demultiplexer.py
+import queue
+import socket
+import threading
+from utils.config import BUFFER_SIZE
+from .rdt import is_ack, is_heartbeat
+
+
+class PacketDemultiplexer:
+    """Leitor único do socket compartilhado do servidor.
+
+    ACKs e heartbeats vão para a caixa de entrada do endereço (consumida pelo
+    RDT daquele peer) e os demais datagramas vão para a fila do loop principal. Assim um
+    RDT.send esperando ACK nunca consome pacotes de outro jogador.
+
+    Com `receptor` (BatchReceiver, network/batch_io.py) o socket é lido em lotes,
+    vários datagramas por chamada de sistema.
+    """
+
+    def __init__(self, sock, receptor=None):
+        self.sock = sock
+        self.receptor = receptor
+        self.inboxes = {}  # addr -> queue.Queue de ACKs e heartbeats
+        self.entrada = queue.Queue()  # (data, addr) para o loop principal
+        self.ack_recebido = threading.Event()  # acorda quem espera ACKs de vários peers
+        self._com_ack = set()  # endereços com ACK novo desde o último aguardar_acks()
+        self._com_controle = set()  # endereços com ACK/heartbeat novo desde o último com_controle()
+        self._lock = threading.Lock()
+        self.ativo = False
+        self.thread = None
+
+    def iniciar(self):
+        """Inicia a thread leitora"""
+        self.ativo = True
+        self.thread = threading.Thread(target=self._loop_leitura, daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.ativo = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+
+    def registrar(self, addr):
+        """Cria (ou retorna) a caixa de ACKs de um endereço"""
+        inbox = self.inboxes.get(addr)
+        if inbox is None:
+            inbox = queue.Queue()
+            self.inboxes[addr] = inbox
+        return inbox
+
+    def remover(self, addr):
+        self.inboxes.pop(addr, None)
+
+    def aguardar_acks(self, timeout=None):
+        """Espera chegar algum ACK e retorna os endereços que receberam ACK
+        desde a última chamada (usado pelo fan-out do broadcast)"""
+        self.ack_recebido.wait(timeout)
+        with self._lock:
+            self.ack_recebido.clear()
+            enderecos, self._com_ack = self._com_ack, set()
+        return enderecos
+
+    def com_controle(self):
+        """Endereços cuja caixa recebeu ACK ou heartbeat desde a última chamada
+        (o loop principal só serve os RDTs com algo a processar)"""
+        with self._lock:
+            enderecos, self._com_controle = self._com_controle, set()
+        return enderecos
+
+    def recvfrom(self, timeout=None):
+        """Próximo datagrama de dados; levanta socket.timeout como o socket faria"""
+        try:
+            return self.entrada.get(timeout=timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+
+    def drenar(self, maximo):
+        """Até `maximo` datagramas de dados que já estão na fila, sem esperar"""
+        datagramas = []
+        try:
+            while len(datagramas) < maximo:
+                datagramas.append(self.entrada.get_nowait())
+        except queue.Empty:
+            pass
+        return datagramas
+
+    def _loop_leitura(self):
+        if self.receptor is not None:
+            self._loop_leitura_lote()
+            return
+        while self.ativo:
+            try:
+                data, addr = self.sock.recvfrom(BUFFER_SIZE)
+            except socket.timeout:
+                continue
+            except OSError:
+                # Windows reporta ICMP "port unreachable" de envios anteriores aqui
+                continue
+            self._rotear(data, addr)
+
+    def _loop_leitura_lote(self):
+        while self.ativo:
+            try:
+                datagramas = self.receptor.receber(timeout=1.0)
+            except OSError:
+                continue
+            for data, addr in datagramas:
+                self._rotear(data, addr)
+
+    def _rotear(self, data, addr):
+        inbox = self.inboxes.get(addr)
+        if inbox is None:
+            self.entrada.put((data, addr))
+        elif is_ack(data):
+            inbox.put(data)
+            with self._lock:
+                self._com_controle.add(addr)
+                self._com_ack.add(addr)
+                self.ack_recebido.set()
+        elif is_heartbeat(data):
+            # Heartbeat não confirma nada: não acorda quem espera ACKs no fan-out
+            inbox.put(data)
+            with self._lock:
+                self._com_controle.add(addr)
+        else:
+            self.entrada.put((data, addr))
@@ -0,0 +1,66 @@
+# network/flight_recorder.py
+"""Gravador de voo do RDT: os últimos eventos de pacote num buffer circular.
+
+Cada evento é uma tupla (instante, peer, seq, tipo, tamanho, resultado) guardada
+num deque de tamanho fixo, então registrar custa um append; nada é formatado
+até alguém despejar o buffer (despejar(), sinal SIGUSR1 ou /eventos na página
+de métricas). Um gravador por processo, compartilhado por todos os RDTs.
+"""
+import collections
+import os
+import signal
+import time
+from utils.config import FLIGHT_RECORDER_SIZE
+
+# Tipos de pacote (os mesmos valores de TYPE_* em network/rdt.py)
+_NOMES_TIPO = {0: "dados", 1: "ack", 2: "heartbeat"}
+
+
+class FlightRecorder:
+    def __init__(self, capacidade=FLIGHT_RECORDER_SIZE):
+        self.eventos = collections.deque(maxlen=capacidade)
+        self._append = self.eventos.append
+
+    def registrar(self, peer, seq, tipo, tamanho, resultado):
+        """Guarda um evento: tipo é TYPE_* do RDT, resultado uma string curta
+        ("enviado", "perdido", "duplicado", ...)"""
+        self._append((time.time(), peer, seq, tipo, tamanho, resultado))
+
+    def linhas(self):
+        """Eventos formatados, do mais antigo ao mais recente"""
+        for instante, peer, seq, tipo, tamanho, resultado in list(self.eventos):
+            hora = time.strftime("%H:%M:%S", time.localtime(instante)) + f".{int(instante % 1 * 1e6):06d}"
+            origem = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else str(peer)
+            yield (f"{hora} {origem:<21} seq={'-' if seq is None else seq:<6} "
+                   f"{_NOMES_TIPO.get(tipo, '-'):<9} {tamanho:>6}B {resultado}")
+
+    def texto(self):
+        return "".join(linha + "\n" for linha in self.linhas())
+
+    def despejar(self, arquivo=None):
+        """Grava os eventos em `arquivo` (padrão: rdt-voo-<pid>-<data>.log) e retorna o caminho"""
+        if arquivo is None:
+            arquivo = f"rdt-voo-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.log"
+        with open(arquivo, "w", encoding="utf-8") as f:
+            f.write(f"# {len(self.eventos)} eventos (capacidade {self.eventos.maxlen})\n")
+            f.write(self.texto())
+        return arquivo
+
+    def instalar_sinal(self):
+        """Despeja o buffer ao receber SIGUSR1 (kill -USR1 <pid>); False onde não há
+        SIGUSR1 (Windows) ou fora da thread principal"""
+        sinal = getattr(signal, "SIGUSR1", None)
+        if sinal is None:
+            return False
+
+        def ao_sinal(numero, quadro):
+            print(f"🛩️ Eventos de pacote gravados em {self.despejar()}")
+
+        try:
+            signal.signal(sinal, ao_sinal)
+        except ValueError:
+            return False
+        return True
+
+
+gravador = FlightRecorder()
@@ -0,0 +1,60 @@
+# network/framing.py
+import struct
+from .rdt import MAX_PAYLOAD
+
+# Lote de mensagens em um datagrama: MAGIC + (tamanho(2) + mensagem) repetido.
+# As mensagens do jogo são texto UTF-8, onde o byte 0xFE nunca aparece, então
+# um datagrama com uma mensagem só continua indo sem moldura nenhuma.
+LOTE_MAGIC = b"\xfe"
+_TAMANHO = struct.Struct("!H")
+
+
+def empacotar(mensagens, limite=MAX_PAYLOAD):
+    """Junta as mensagens (bytes, em ordem) no menor número de datagramas de até `limite` bytes.
+
+    Mensagem que não cabe sozinha num lote sai avulsa (o RDT fragmenta).
+    """
+    datagramas = []
+    atual = []
+    tamanho = len(LOTE_MAGIC)
+
+    def fechar():
+        if len(atual) == 1:
+            datagramas.append(atual[0])
+        elif atual:
+            partes = [LOTE_MAGIC]
+            for mensagem in atual:
+                partes.append(_TAMANHO.pack(len(mensagem)))
+                partes.append(mensagem)
+            datagramas.append(b"".join(partes))
+
+    for mensagem in mensagens:
+        custo = _TAMANHO.size + len(mensagem)
+        if len(LOTE_MAGIC) + custo > limite:
+            fechar()
+            atual, tamanho = [], len(LOTE_MAGIC)
+            datagramas.append(mensagem)
+            continue
+        if tamanho + custo > limite:
+            fechar()
+            atual, tamanho = [], len(LOTE_MAGIC)
+        atual.append(mensagem)
+        tamanho += custo
+    fechar()
+    return datagramas
+
+
+def desempacotar(data):
+    """Separa um datagrama recebido nas mensagens originais (lista de bytes)"""
+    if not data.startswith(LOTE_MAGIC):
+        return [bytes(data)]
+
+    mensagens = []
+    view = memoryview(data)
+    pos = len(LOTE_MAGIC)
+    while pos + _TAMANHO.size <= len(view):
+        (tamanho,) = _TAMANHO.unpack_from(view, pos)
+        pos += _TAMANHO.size
+        mensagens.append(bytes(view[pos:pos + tamanho]))
+        pos += tamanho
+    return mensagens
@@ -0,0 +1,230 @@
+# network/metrics.py
+"""Métricas de transporte: contadores e histogramas por RDT (um por peer) e por
+ConnectionManager, e a página de estatísticas no formato de texto do Prometheus.
+
+No caminho quente só há somas de inteiros e um bisect por amostra de tempo; a
+página é montada apenas quando alguém a consulta.
+"""
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (segundos) dos baldes dos histogramas de tempo; o último balde é o +Inf
+LIMITES_TEMPO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Limites dos histogramas de quantidade (mensagens por lote)
+LIMITES_QUANTIDADE = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histograma:
+    __slots__ = ("limites", "baldes", "soma", "total")
+
+    def __init__(self, limites=LIMITES_TEMPO):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """[(limite, contagem acumulada)], terminando em ("+Inf", total)"""
+        resultado = []
+        acumulado = 0
+        for limite, contagem in zip(self.limites + ("+Inf",), self.baldes):
+            acumulado += contagem
+            resultado.append((limite, acumulado))
+        return resultado
+
+
+class MetricasRDT:
+    """Contadores de um RDT. Pacotes e bytes contam tudo que passou pelo socket
+    (dados, ACKs e heartbeats); `bloqueio_envio` é o tempo de cada send() até o ACK
+    (no AsyncRDT, de enviar() até o último ACK, sem bloquear o event loop)."""
+
+    CONTADORES = (
+        "pacotes_enviados", "bytes_enviados", "pacotes_recebidos", "bytes_recebidos",
+        "retransmissoes", "falhas_checksum", "invalidos", "duplicados",
+    )
+    __slots__ = CONTADORES + ("rtt", "bloqueio_envio")
+
+    def __init__(self):
+        for nome in self.CONTADORES:
+            setattr(self, nome, 0)
+        self.rtt = Histograma()
+        self.bloqueio_envio = Histograma()
+
+
+class MetricasConexoes:
+    """Contadores de um ConnectionManager: mensagens para jogadores, fan-outs e lotes"""
+
+    CONTADORES = ("mensagens_enviadas", "envios_diretos", "fan_outs", "falhas_entrega")
+    __slots__ = CONTADORES + ("bloqueio_fan_out", "mensagens_por_fan_out")
+
+    def __init__(self):
+        for nome in self.CONTADORES:
+            setattr(self, nome, 0)
+        self.bloqueio_fan_out = Histograma()
+        self.mensagens_por_fan_out = Histograma(LIMITES_QUANTIDADE)
+
+
+_AJUDA = {
+    "rdt_pacotes_enviados": "Datagramas enviados ao peer (dados, ACKs e heartbeats)",
+    "rdt_bytes_enviados": "Bytes enviados ao peer",
+    "rdt_pacotes_recebidos": "Datagramas recebidos do peer",
+    "rdt_bytes_recebidos": "Bytes recebidos do peer",
+    "rdt_retransmissoes": "Pacotes reenviados por timeout",
+    "rdt_falhas_checksum": "Pacotes descartados por checksum errado",
+    "rdt_invalidos": "Datagramas que não são pacotes RDT",
+    "rdt_duplicados": "Pacotes de dados já entregues recebidos de novo",
+    "rdt_rtt_segundos": "Amostras de RTT (regra de Karn: só pacotes sem retransmissão)",
+    "rdt_bloqueio_envio_segundos": "Tempo de cada send() até o ACK",
+    "rdt_em_voo": "Pacotes aguardando ACK",
+    "rdt_rto_segundos": "Timeout de retransmissão atual",
+    "conexoes_mensagens_enviadas": "Mensagens enviadas a jogadores",
+    "conexoes_envios_diretos": "Mensagens enviadas fora de lote/broadcast",
+    "conexoes_fan_outs": "Fan-outs (broadcasts e lotes de um tick)",
+    "conexoes_falhas_entrega": "Entregas a jogadores que falharam",
+    "conexoes_bloqueio_fan_out_segundos": "Tempo bloqueado em cada fan-out",
+    "conexoes_mensagens_por_fan_out": "Mensagens em cada fan-out (profundidade da fila do tick)",
+    "jogadores": "Jogadores conectados",
+    "salas": "Salas abertas",
+    "partidas": "Salas com jogo em andamento",
+    "rdts": "Peers com RDT (inclui quem ainda não logou)",
+    "fila_entrada": "Datagramas esperando o loop principal",
+    "io_chamadas_recepcao": "Chamadas de sistema de leitura do socket (E/S em lote)",
+    "io_datagramas_recebidos": "Datagramas lidos do socket (E/S em lote)",
+    "io_chamadas_envio": "Chamadas de sistema de envio (E/S em lote)",
+    "io_datagramas_enviados": "Datagramas enviados pelo socket (E/S em lote)",
+}
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(rotulos, extra=None):
+    pares = dict(rotulos)
+    if extra:
+        pares.update(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares.items()) + "}"
+
+
+class _Pagina:
+    """Monta o texto agrupando as séries de cada métrica sob um único # HELP/# TYPE"""
+
+    def __init__(self, prefixo):
+        self.prefixo = prefixo
+        self.series = {}  # nome -> (tipo, [linhas])
+
+    def _linhas(self, nome, tipo):
+        return self.series.setdefault(nome, (tipo, []))[1]
+
+    def contador(self, nome, rotulos, valor):
+        self._linhas(nome, "counter").append(f"{self.prefixo}{nome}_total{_rotulos(rotulos)} {valor}")
+
+    def medidor(self, nome, rotulos, valor):
+        self._linhas(nome, "gauge").append(f"{self.prefixo}{nome}{_rotulos(rotulos)} {valor}")
+
+    def histograma(self, nome, rotulos, histograma):
+        linhas = self._linhas(nome, "histogram")
+        completo = self.prefixo + nome
+        for limite, acumulado in histograma.acumulados():
+            linhas.append(f"{completo}_bucket{_rotulos(rotulos, {'le': limite})} {acumulado}")
+        linhas.append(f"{completo}_sum{_rotulos(rotulos)} {histograma.soma}")
+        linhas.append(f"{completo}_count{_rotulos(rotulos)} {histograma.total}")
+
+    def texto(self):
+        saida = []
+        for nome, (tipo, linhas) in self.series.items():
+            completo = self.prefixo + nome + ("_total" if tipo == "counter" else "")
+            if nome in _AJUDA:
+                saida.append(f"# HELP {completo} {_AJUDA[nome]}")
+            saida.append(f"# TYPE {completo} {tipo}")
+            saida.extend(linhas)
+        return "\n".join(saida) + "\n"
+
+
+def renderizar_prometheus(rdts, conexoes=None, medidores=None, contadores=None, prefixo="huntcin_"):
+    """Texto no formato do Prometheus.
+
+    rdts: [(rótulos, RDT)], ex.: ({"peer": "127.0.0.1:5001", "jogador": "João"}, rdt)
+    conexoes: MetricasConexoes do ConnectionManager
+    medidores: {nome: valor} com o estado do servidor (jogadores, salas, ...)
+    contadores: {nome: valor} com outros totais do processo (E/S em lote)
+    """
+    pagina = _Pagina(prefixo)
+    for nome, valor in (medidores or {}).items():
+        pagina.medidor(nome, {}, valor)
+    for nome, valor in (contadores or {}).items():
+        pagina.contador(nome, {}, valor)
+
+    if conexoes is not None:
+        for nome in MetricasConexoes.CONTADORES:
+            pagina.contador(f"conexoes_{nome}", {}, getattr(conexoes, nome))
+        pagina.histograma("conexoes_bloqueio_fan_out_segundos", {}, conexoes.bloqueio_fan_out)
+        pagina.histograma("conexoes_mensagens_por_fan_out", {}, conexoes.mensagens_por_fan_out)
+
+    for rotulos, rdt in rdts:
+        metricas = rdt.metricas
+        for nome in MetricasRDT.CONTADORES:
+            pagina.contador(f"rdt_{nome}", rotulos, getattr(metricas, nome))
+        pagina.medidor("rdt_em_voo", rotulos, len(rdt._in_flight))
+        pagina.medidor("rdt_rto_segundos", rotulos, rdt.rto)
+        pagina.histograma("rdt_rtt_segundos", rotulos, metricas.rtt)
+        pagina.histograma("rdt_bloqueio_envio_segundos", rotulos, metricas.bloqueio_envio)
+    return pagina.texto()
+
+
+class StatsServer:
+    """Página de métricas em http://127.0.0.1:<porta>/metrics, servida por uma thread.
+
+    `gerar_texto()` é chamado a cada consulta, na thread do servidor HTTP;
+    `paginas` acrescenta outros caminhos ({"/eventos": função que gera o texto}).
+    """
+
+    def __init__(self, porta, gerar_texto, host="127.0.0.1", paginas=None):
+        self.endereco = (host, porta)
+        self.paginas = {"/": gerar_texto, "/metrics": gerar_texto}
+        self.paginas.update(paginas or {})
+        self.httpd = None
+        self.thread = None
+
+    def iniciar(self):
+        paginas = self.paginas
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                gerar_texto = paginas.get(self.path.split("?")[0])
+                if gerar_texto is None:
+                    self.send_error(404)
+                    return
+                try:
+                    corpo = gerar_texto().encode()
+                except Exception as e:
+                    logging.error(f"[Métricas] Erro montando a página: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                pass  # uma linha por consulta poluiria o console do servidor
+
+        self.httpd = ThreadingHTTPServer(self.endereco, _Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="huntcin-stats", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
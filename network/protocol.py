@@ -0,0 +1,319 @@
+# network/protocol.py
+import struct
+
+# Protocolo binário das mensagens do jogo: MAGIC(1) + versão(1) + opcode(1) + campos
+# de tamanho fixo, com nomes prefixados por 1 byte de tamanho. O texto que o jogador
+# vê é montado localmente por renderizar(); peers que só falam texto recebem esse
+# mesmo texto (o protocolo de texto continua valendo como fallback).
+# Texto UTF-8 nunca começa com 0xFF, então as duas formas convivem no mesmo socket.
+MAGIC = 0xFF
+VERSAO = 1
+_CABECALHO = struct.Struct("!BBB")
+
+# Cliente -> servidor
+OP_LOGIN = 1
+OP_COMANDO = 2
+OP_ENTRAR = 3   # troca de sala ("join <sala>")
+
+# Servidor -> cliente
+OP_ESTADO = 10
+OP_RODADA = 11
+OP_SUA_VEZ = 12
+OP_SEM_ACAO = 13
+OP_TEMPO_ESGOTADO = 14
+OP_VITORIA = 15
+OP_PLACAR = 16
+OP_DELTA = 17
+OP_SNAPSHOT = 18
+
+# "resync" pede ao servidor o estado completo (snapshot) quando um delta não se aplica
+COMANDOS = ("move up", "move down", "move left", "move right", "hint", "suggest", "logout", "resync")
+_CODIGOS = {comando: codigo for codigo, comando in enumerate(COMANDOS)}
+
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+_POSICAO = struct.Struct("!HH")          # x, y
+_RODADA = struct.Struct("!HB")           # rodada, timeout
+_SUA_VEZ = struct.Struct("!HHHBB")       # rodada, x, y, usados (bit0 hint, bit1 suggest), timeout
+_VITORIA = struct.Struct("!HHH")         # porta, x, y
+_VERSAO = struct.Struct("!I")
+_JOGADOR = struct.Struct("!HHBH")        # x, y, usados, score
+
+HINT_USADO = 0x01
+SUGGEST_USADO = 0x02
+
+
+def is_binario(data):
+    """Indica se a mensagem está no formato binário"""
+    return len(data) >= _CABECALHO.size and data[0] == MAGIC
+
+
+def _mensagem(opcode, *campos):
+    return _CABECALHO.pack(MAGIC, VERSAO, opcode) + b"".join(campos)
+
+
+def _nome(nome):
+    dados = nome.encode()[:255]
+    return _U8.pack(len(dados)) + dados
+
+
+def _nomes(nomes):
+    return _U16.pack(len(nomes)) + b"".join(_nome(nome) for nome in nomes)
+
+
+# =====================
+#      CODIFICAÇÃO
+# =====================
+
+def login(nome, sala=None):
+    """Login; a sala é opcional (sem ela o servidor escolhe)"""
+    return _mensagem(OP_LOGIN, _nome(nome), _nome(sala) if sala else b"")
+
+
+def entrar(sala):
+    return _mensagem(OP_ENTRAR, _nome(sala))
+
+
+def comando(texto):
+    """Comando do jogador em binário, ou None se não for um comando conhecido"""
+    codigo = _CODIGOS.get(texto)
+    if codigo is None:
+        return None
+    return _mensagem(OP_COMANDO, _U8.pack(codigo))
+
+
+def codificar_texto(texto):
+    """Versão binária do que o cliente digitou ("login <nome> [sala]", "join <sala>" ou comando), ou None"""
+    partes = texto.split()
+    if len(partes) in (2, 3) and partes[0].lower() == "login":
+        return login(*partes[1:])
+    if len(partes) == 2 and partes[0].lower() == "join":
+        return entrar(partes[1])
+    return comando(" ".join(partes).lower())
+
+
+def estado(jogadores):
+    """jogadores: [(nome, x, y)] em coordenadas humanas"""
+    campos = [_U16.pack(len(jogadores))]
+    for nome, x, y in jogadores:
+        campos.append(_nome(nome) + _POSICAO.pack(x, y))
+    return _mensagem(OP_ESTADO, *campos)
+
+
+def rodada(numero, timeout):
+    return _mensagem(OP_RODADA, _RODADA.pack(numero, timeout))
+
+
+def sua_vez(numero, x, y, hint_used, suggest_used, timeout):
+    usados = (HINT_USADO if hint_used else 0) | (SUGGEST_USADO if suggest_used else 0)
+    return _mensagem(OP_SUA_VEZ, _SUA_VEZ.pack(numero, x, y, usados, timeout))
+
+
+def sem_acao(nomes):
+    return _mensagem(OP_SEM_ACAO, _nomes(nomes))
+
+
+def tempo_esgotado():
+    return _mensagem(OP_TEMPO_ESGOTADO)
+
+
+def vitoria(nome, porta, x, y):
+    return _mensagem(OP_VITORIA, _nome(nome), _VITORIA.pack(porta, x, y))
+
+
+def _jogadores(jogadores):
+    campos = [_U16.pack(len(jogadores))]
+    for nome, x, y, hint_used, suggest_used, score in jogadores:
+        usados = (HINT_USADO if hint_used else 0) | (SUGGEST_USADO if suggest_used else 0)
+        campos.append(_nome(nome) + _JOGADOR.pack(x, y, usados, score))
+    return b"".join(campos)
+
+
+def delta(base, versao, jogadores, removidos):
+    """Mudanças do estado da versão `base` para `versao`.
+
+    jogadores: [(nome, x, y, hint_used, suggest_used, score)] só dos que mudaram;
+    removidos: nomes que saíram do jogo.
+    """
+    return _mensagem(OP_DELTA, _VERSAO.pack(base), _VERSAO.pack(versao), _jogadores(jogadores), _nomes(removidos))
+
+
+def snapshot(versao, jogadores):
+    """Estado completo na `versao` (mesmo formato de jogadores do delta)"""
+    return _mensagem(OP_SNAPSHOT, _VERSAO.pack(versao), _jogadores(jogadores))
+
+
+def placar(pontuacoes):
+    """pontuacoes: [(nome, score)]"""
+    campos = [_U16.pack(len(pontuacoes))]
+    for nome, score in pontuacoes:
+        campos.append(_nome(nome) + _U16.pack(score))
+    return _mensagem(OP_PLACAR, *campos)
+
+
+# =====================
+#     DECODIFICAÇÃO
+# =====================
+
+def _ler_nome(data, pos):
+    tamanho = data[pos]
+    pos += 1
+    return bytes(data[pos:pos + tamanho]).decode('utf-8', errors='ignore'), pos + tamanho
+
+
+def _ler_nomes(data, pos):
+    (quantidade,) = _U16.unpack_from(data, pos)
+    pos += _U16.size
+    nomes = []
+    for _ in range(quantidade):
+        nome, pos = _ler_nome(data, pos)
+        nomes.append(nome)
+    return nomes, pos
+
+
+def _ler_estado(data, pos):
+    (quantidade,) = _U16.unpack_from(data, pos)
+    pos += _U16.size
+    jogadores = []
+    for _ in range(quantidade):
+        nome, pos = _ler_nome(data, pos)
+        jogadores.append((nome,) + _POSICAO.unpack_from(data, pos))
+        pos += _POSICAO.size
+    return (jogadores,)
+
+
+def _ler_placar(data, pos):
+    (quantidade,) = _U16.unpack_from(data, pos)
+    pos += _U16.size
+    pontuacoes = []
+    for _ in range(quantidade):
+        nome, pos = _ler_nome(data, pos)
+        pontuacoes.append((nome,) + _U16.unpack_from(data, pos))
+        pos += _U16.size
+    return (pontuacoes,)
+
+
+def _ler_jogadores(data, pos):
+    (quantidade,) = _U16.unpack_from(data, pos)
+    pos += _U16.size
+    jogadores = []
+    for _ in range(quantidade):
+        nome, pos = _ler_nome(data, pos)
+        x, y, usados, score = _JOGADOR.unpack_from(data, pos)
+        pos += _JOGADOR.size
+        jogadores.append((nome, x, y, bool(usados & HINT_USADO), bool(usados & SUGGEST_USADO), score))
+    return jogadores, pos
+
+
+def _ler_delta(data, pos):
+    (base,) = _VERSAO.unpack_from(data, pos)
+    (versao,) = _VERSAO.unpack_from(data, pos + _VERSAO.size)
+    jogadores, pos = _ler_jogadores(data, pos + 2 * _VERSAO.size)
+    removidos, _ = _ler_nomes(data, pos)
+    return base, versao, jogadores, removidos
+
+
+def _ler_snapshot(data, pos):
+    (versao,) = _VERSAO.unpack_from(data, pos)
+    return versao, _ler_jogadores(data, pos + _VERSAO.size)[0]
+
+
+def _ler_login(data, pos):
+    nome, pos = _ler_nome(data, pos)
+    if pos < len(data):
+        return nome, _ler_nome(data, pos)[0]
+    return nome, None
+
+
+def _ler_vitoria(data, pos):
+    nome, pos = _ler_nome(data, pos)
+    return (nome,) + _VITORIA.unpack_from(data, pos)
+
+
+def _ler_sua_vez(data, pos):
+    numero, x, y, usados, timeout = _SUA_VEZ.unpack_from(data, pos)
+    return numero, x, y, bool(usados & HINT_USADO), bool(usados & SUGGEST_USADO), timeout
+
+
+_LEITORES = {
+    OP_LOGIN: _ler_login,
+    OP_ENTRAR: lambda data, pos: (_ler_nome(data, pos)[0],),
+    OP_COMANDO: lambda data, pos: (COMANDOS[data[pos]],),
+    OP_ESTADO: _ler_estado,
+    OP_RODADA: lambda data, pos: _RODADA.unpack_from(data, pos),
+    OP_SUA_VEZ: _ler_sua_vez,
+    OP_SEM_ACAO: lambda data, pos: (_ler_nomes(data, pos)[0],),
+    OP_TEMPO_ESGOTADO: lambda data, pos: (),
+    OP_VITORIA: _ler_vitoria,
+    OP_PLACAR: _ler_placar,
+    OP_DELTA: _ler_delta,
+    OP_SNAPSHOT: _ler_snapshot,
+}
+
+
+def decodificar(data):
+    """Decodifica mensagem binária em (opcode, campos); levanta ValueError se inválida"""
+    if not is_binario(data):
+        raise ValueError("Mensagem não está no formato binário")
+    _, versao, opcode = _CABECALHO.unpack_from(data)
+    if versao != VERSAO:
+        raise ValueError(f"Versão de protocolo não suportada: {versao}")
+    leitor = _LEITORES.get(opcode)
+    if leitor is None:
+        raise ValueError(f"Opcode desconhecido: {opcode}")
+    try:
+        return opcode, leitor(data, _CABECALHO.size)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Mensagem binária truncada (opcode {opcode})") from e
+
+
+# =====================
+#     RENDERIZAÇÃO
+# =====================
+
+def texto_estado(jogadores):
+    """Texto do estado a partir de [(nome, x, y, ...)]"""
+    return "[Servidor] Estado atual: " + ", ".join(f"{j[0]}({j[1]},{j[2]})" for j in jogadores)
+
+
+def _texto_sua_vez(numero, x, y, hint_used, suggest_used, timeout):
+    msg = f"\n🔔 RODADA {numero} iniciada!"
+    msg += f"\n🎯 SUA VEZ!"
+    msg += f"\n📍 Sua posição: ({x},{y})"
+    msg += "\n🎮 Comandos: move up | move down | move left | move right | hint | suggest | logout"
+    msg += f"\nHint: {'já usado' if hint_used else 'disponível (1 uso)'}"
+    msg += f"\nSuggest: {'já usado' if suggest_used else 'disponível (1 uso)'}"
+    msg += f"\n\n⏰ Você tem {timeout} segundos!"
+    msg += f"\n> Digite seu comando:"
+    return msg
+
+
+def _texto_vitoria(nome, porta, x, y):
+    return (
+        f"\nO jogador {nome}:{porta} encontrou o tesouro na posição ({x},{y})!"
+        f"\n🎉 {nome.upper()} É O VENCEDOR!"
+        f"\n⏳ Reiniciando em 30 segundos..."
+    )
+
+
+_TEXTOS = {
+    OP_LOGIN: lambda nome, sala: f"login {nome} {sala}" if sala else f"login {nome}",
+    OP_ENTRAR: lambda sala: f"join {sala}",
+    OP_COMANDO: lambda comando: comando,
+    OP_ESTADO: texto_estado,
+    OP_RODADA: lambda numero, timeout: f"\n🔔 RODADA {numero} iniciada! Envie seu comando em até {timeout}s.",
+    OP_SUA_VEZ: _texto_sua_vez,
+    OP_SEM_ACAO: lambda nomes: f"\n⏰ Jogadores sem ação: {', '.join(nomes)}",
+    OP_TEMPO_ESGOTADO: lambda: "\n⏰ Tempo esgotado! Você perdeu o turno.",
+    OP_VITORIA: _texto_vitoria,
+    OP_PLACAR: lambda pontuacoes: "🏆 Placar: " + ", ".join(f"{nome}={score}" for nome, score in pontuacoes),
+    # Sem o estado anterior, o delta só mostra quem mudou (o cliente usa o estado que mantém)
+    OP_DELTA: lambda base, versao, jogadores, removidos: texto_estado(jogadores),
+    OP_SNAPSHOT: lambda versao, jogadores: texto_estado(jogadores),
+}
+
+
+def renderizar(data):
+    """Texto equivalente a uma mensagem binária (o mesmo que o protocolo de texto enviaria)"""
+    opcode, campos = decodificar(data)
+    return _TEXTOS[opcode](*campos)
@@ -5,185 +5,620 @@ import time
 import logging
 import select
 import hashlib
-from utils.config import TIMEOUT, LOSS_PROBABILITY
+import struct
+import queue
+from collections import deque
+from utils.config import (
+    BUFFER_SIZE, TIMEOUT, LOSS_PROBABILITY, RDT_MODE, RDT_WINDOW_SIZE, RTO_MIN, RTO_MAX,
+    RDT_CHECKSUM, MAX_MESSAGE_SIZE
+)
+from .checksum import CHECKSUMS, CHECKSUM_IDS, get_checksum_id
+from .metrics import MetricasRDT
+from .flight_recorder import gravador
+
+MODE_STOP_AND_WAIT = "stop_and_wait"
+MODE_WINDOW = "janela"
+
+# Formato versionado: versão(1) + flags(1) + seq(4) + checksum(4) + data, com
+# flags = (id do checksum << 4) | FLAG_FRAGMENT? | tipo. O formato legado (seq(1) +
+# MD5(4) + data e ACK de 1 byte) começa com seq 0 ou 1, então a versão 2 não é ambígua.
+PROTOCOL_VERSION = 2
+TYPE_DATA = 0
+TYPE_ACK = 1
+TYPE_HEARTBEAT = 2  # keepalive sem seq, sem ACK e sem retransmissão
+TYPE_MASK = 0x07
+_HEADER = struct.Struct("!BBI")
+HEADER_SIZE = _HEADER.size + 4
+LEGACY = "legado"
+
+# Mensagens maiores que um datagrama viajam em fragmentos, cada um com seq próprio
+# e com FLAG_FRAGMENT; os dados de cada fragmento começam com tamanho_total(4) +
+# offset(4) para o receptor pré-alocar o buffer e saber onde copiar o pedaço.
+FLAG_FRAGMENT = 0x08
+_FRAGMENT = struct.Struct("!II")
+MAX_PAYLOAD = BUFFER_SIZE - HEADER_SIZE
+FRAGMENT_PAYLOAD = MAX_PAYLOAD - _FRAGMENT.size
+
+
+def is_ack(packet):
+    """Indica se o datagrama é um ACK (de qualquer um dos formatos)"""
+    if len(packet) == 1:
+        return True
+    return len(packet) >= HEADER_SIZE and packet[0] == PROTOCOL_VERSION and (packet[1] & TYPE_MASK) == TYPE_ACK
+
+
+def is_heartbeat(packet):
+    """Indica se o datagrama é um heartbeat (só existe no formato versionado)"""
+    return len(packet) >= HEADER_SIZE and packet[0] == PROTOCOL_VERSION and (packet[1] & TYPE_MASK) == TYPE_HEARTBEAT
+
+
+def send_to_all(rdts, data, aguardar_acks=None):
+    """Fan-out: transmite a mesma mensagem para todos os peers (ver send_batch)"""
+    return send_batch({rdt: [data] for rdt in rdts}, aguardar_acks)
+
+
+def send_batch(envios, aguardar_acks=None, inativo_apos=None):
+    """Fan-out: transmite {rdt: [dados, ...]} para todos os peers de uma vez e
+    aguarda os ACKs em paralelo, retransmitindo só para quem ainda não confirmou.
+
+    Cada peer recebe a sua lista em ordem; o próximo pacote dele entra na rede
+    assim que a janela do RDT permitir. `aguardar_acks(timeout)` bloqueia até
+    chegar algum ACK e retorna os endereços que receberam ACK
+    (PacketDemultiplexer.aguardar_acks); assim cada ACK custa O(1). Sem ele a
+    espera é feita por polling curto.
+    Com `inativo_apos`, desiste na hora de peers que mandam heartbeat mas estão
+    calados há mais que isso, em vez de esgotar as retransmissões.
+    Retorna {rdt: None se entregue, ou a exceção do envio}.
+    """
+    resultados = {}
+    filas = {rdt: deque(dados) for rdt, dados in envios.items()}
+    ultimo = {}  # rdt -> seq do último pacote colocado na rede
+
+    def avancar(rdt):
+        """Processa ACKs, envia o que couber na janela e indica se o peer terminou"""
+        fila = filas[rdt]
+        try:
+            if inativo_apos is not None and rdt.is_inativo(inativo_apos):
+                rdt._in_flight.clear()
+                raise Exception(f"Peer sem sinal há mais de {inativo_apos}s")
+            rdt.poll()
+            while fila and not rdt._window_full():
+                ultimo[rdt] = rdt.begin_send(fila.popleft())
+        except Exception as e:
+            resultados[rdt] = e
+            return True
+        if fila or (rdt in ultimo and rdt.is_pending(ultimo[rdt])):
+            return False
+        resultados[rdt] = None
+        return True
+
+    def proximo_prazo():
+        prazos = [rdt._next_deadline() for rdt in pendentes]
+        return time.time() + min((p for p in prazos if p is not None), default=0.001)
+
+    # Com saída em lote (BatchSender) tudo que foi enfileirado sai numa chamada antes de cada espera
+    descarregar = {rdt._descarregar for rdt in filas if rdt._descarregar is not None}
+    pendentes = {rdt for rdt in filas if not avancar(rdt)}
+    por_addr = {rdt.remote_addr: rdt for rdt in pendentes}
+    prazo = proximo_prazo()
+    candidatos = []
+    while pendentes:
+        for rdt in candidatos:
+            if rdt in pendentes and avancar(rdt):
+                pendentes.discard(rdt)
+        if not pendentes:
+            break
+
+        if time.time() >= prazo:
+            # Timers vencidos: retransmite só para quem ainda não confirmou
+            pendentes = {rdt for rdt in pendentes if not avancar(rdt)}
+            if not pendentes:
+                break
+            prazo = proximo_prazo()
+
+        for enviar in descarregar:
+            enviar()
+        espera = max(0.0, prazo - time.time())
+        if aguardar_acks is not None:
+            candidatos = [por_addr[addr] for addr in aguardar_acks(espera) if addr in por_addr]
+        else:
+            time.sleep(min(espera, 0.001))
+            candidatos = list(pendentes)
+
+    return resultados
 
-logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class RDT:
-    def __init__(self, sock, remote_addr):
+    def __init__(self, sock, remote_addr, mode=RDT_MODE, window_size=RDT_WINDOW_SIZE, inbox=None,
+                 checksum=RDT_CHECKSUM):
         self.sock = sock
+        # Com um BatchSender (network/batch_io.py) os envios ficam numa fila, que
+        # precisa ser descarregada antes de esperar qualquer ACK
+        self._descarregar = getattr(sock, "descarregar", None)
         self.remote_addr = remote_addr
+        # Com inbox (fila do PacketDemultiplexer) o RDT não lê o socket compartilhado
+        self.inbox = inbox
+        self.mode = mode
+        self.window_size = window_size if mode == MODE_WINDOW else 1
+
+        # Formato/algoritmo de envio; passa a seguir o do peer quando ele fala primeiro
+        self.legacy = checksum == LEGACY
+        if self.legacy and mode == MODE_WINDOW:
+            raise ValueError("O modo janela exige o formato versionado (checksum != 'legado')")
+        self._set_checksum(CHECKSUM_IDS["md5"] if self.legacy else get_checksum_id(checksum))
         self.send_seq_num = 0
         self.recv_seq_num = 0
-        self.timeout = TIMEOUT
+        self.max_tentativas = 10
+
+        # Estimativa de RTT do peer (RFC 6298); rto começa no TIMEOUT configurado
+        self.srtt = None
+        self.rttvar = None
+        self.rto = TIMEOUT
+        self._backoffs = 0  # duplicações do rto feitas; cada pacote guarda o valor de quando foi armado
+
+        # Vivacidade: instante do último pacote válido do peer e se ele manda heartbeats
+        self.last_active = time.time()
+        self.peer_heartbeat = False
+        self.metricas = MetricasRDT()  # contadores expostos em network/metrics.py
+        self.ao_transmitir = None  # callback(rdt) quando um pacote novo entra em voo
+
+        self._in_flight = {}       # seq -> [pacote, instante_envio, tentativas, prazo, backoffs]
+        self._out_of_order = {}    # seq -> (data, fragmento) (receptor no modo janela)
+        self._delivered = deque()  # mensagens já em ordem aguardando recv()
+        self._remontagem = None    # memoryview do buffer da mensagem fragmentada em curso
+        self._remontado = 0        # bytes já copiados para o buffer
+
+    def _set_checksum(self, checksum_id):
+        self.checksum_id = checksum_id
+        self._checksum = CHECKSUMS[checksum_id]
 
     def _calculate_checksum(self, data):
-        """Calcula checksum MD5 (4 bytes)"""
+        """Calcula checksum MD5 (4 bytes) do formato legado"""
         return hashlib.md5(data).digest()[:4]
 
+    def _build_packet(self, seq, data, tipo=TYPE_DATA):
+        """Monta pacote no formato versionado (ou no legado, para peers antigos)"""
+        if self.legacy:
+            seq_byte = seq.to_bytes(1, 'big')
+            return seq_byte + self._calculate_checksum(seq_byte + data) + data
+        header = _HEADER.pack(PROTOCOL_VERSION, (self.checksum_id << 4) | tipo, seq)
+        return header + self._checksum(header, data) + data
+
     def _make_packet(self, data):
-        """Cria pacote: seq(1) + checksum(4) + data"""
-        seq_byte = self.send_seq_num.to_bytes(1, 'big')
-        checksum = self._calculate_checksum(seq_byte + data)
-        return seq_byte + checksum + data
+        """Cria pacote: cabeçalho versionado (ou seq(1) + checksum(4)) + data"""
+        return self._build_packet(self.send_seq_num, data)
+
+    def _fragments(self, data):
+        """Divide a mensagem em [(dados, tipo)] que cabem em um datagrama de BUFFER_SIZE.
+
+        Os pedaços são fatias de um memoryview, sem cópia intermediária. O formato
+        legado não tem fragmentação e segue mandando a mensagem inteira.
+        """
+        if self.legacy or len(data) <= MAX_PAYLOAD:
+            return [(data, TYPE_DATA)]
+        if len(data) > MAX_MESSAGE_SIZE:
+            raise ValueError(f"Mensagem de {len(data)} bytes excede o limite de {MAX_MESSAGE_SIZE}")
+
+        total = len(data)
+        view = memoryview(data)
+        return [
+            (_FRAGMENT.pack(total, offset) + view[offset:offset + FRAGMENT_PAYLOAD], TYPE_DATA | FLAG_FRAGMENT)
+            for offset in range(0, total, FRAGMENT_PAYLOAD)
+        ]
+
+    def _make_ack(self, seq):
+        """Cria ACK: cabeçalho com tipo ACK (ou seq(1) no formato legado)"""
+        if self.legacy:
+            return seq.to_bytes(1, 'big')
+        return self._build_packet(seq, b"", TYPE_ACK)
+
+    def _decode(self, packet):
+        """Decodifica datagrama em (tipo, seq, data, checksum_ok, checksum_id, fragmento)
+        ou None se inválido.
+
+        checksum_id é None para pacotes do formato legado. No formato versionado
+        data é um memoryview sobre o datagrama (sem cópia).
+        """
+        if len(packet) == 1:
+            return TYPE_ACK, packet[0], b"", True, None, False
+
+        if packet[0] == PROTOCOL_VERSION:
+            if len(packet) < HEADER_SIZE:
+                return None
+            _, flags, seq = _HEADER.unpack_from(packet)
+            checksum = CHECKSUMS.get(flags >> 4)
+            if checksum is None:
+                return None
+            header = packet[:_HEADER.size]
+            received_checksum = packet[_HEADER.size:HEADER_SIZE]
+            data = memoryview(packet)[HEADER_SIZE:]
+            checksum_ok = received_checksum == checksum(header, data)
+            return flags & TYPE_MASK, seq, data, checksum_ok, flags >> 4, bool(flags & FLAG_FRAGMENT)
 
-    def parse_packet(self, packet):
-        """Método público para parsear pacote RDT"""
         if len(packet) < 5:
-            return None, None, False
-        
+            return None
+
         seq = packet[0]
         received_checksum = packet[1:5]
         data = packet[5:]
-        
+
         # Verifica checksum
         seq_byte = seq.to_bytes(1, 'big')
         calculated_checksum = self._calculate_checksum(seq_byte + data)
-        
+
         checksum_ok = (received_checksum == calculated_checksum)
-        
-        return seq, data, checksum_ok
 
-    def _send_with_loss(self, packet):
-        """Simula perda de pacotes com probabilidade configurável"""
-        if random.random() < LOSS_PROBABILITY:
-            logging.info(f"[RDT] Pacote (seq={self.send_seq_num}) SIMULADO como PERDIDO!")
+        return TYPE_DATA, seq, data, checksum_ok, None, False
+
+    def parse_packet(self, packet):
+        """Método público para parsear pacote RDT"""
+        decoded = self._decode(packet)
+        if decoded is None or decoded[0] != TYPE_DATA:
+            return None, None, False
+        _, seq, data, checksum_ok, _, _ = decoded
+        return seq, bytes(data), checksum_ok
+
+    def _send_with_loss(self, packet, seq, resultado="enviado"):
+        """Envia um pacote de dados (perda simulada com probabilidade configurável)
+        e registra o evento no gravador de voo"""
+        if LOSS_PROBABILITY and random.random() < LOSS_PROBABILITY:
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "perdido")
             return False
         try:
-            sent = self.sock.sendto(packet, self.remote_addr)
-            logging.info(f"[RDT] Enviado pacote (seq={self.send_seq_num}, {sent} bytes)")
+            self._sendto(packet)
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), resultado)
             return True
         except OSError as e:
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "erro_envio")
             if getattr(e, "winerror", None) in (10054, 10061):
                 logging.error(f"[RDT] Conexão resetada/recusada ao enviar: {e}")
                 raise ConnectionResetError from e
             logging.error(f"[RDT] Erro ao enviar: {e}")
             return False
         except Exception as e:
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "erro_envio")
             logging.error(f"[RDT] Erro ao enviar: {e}")
             return False
 
-    def send(self, data):
-        """Envia dados usando RDT 3.0 (com ACK e timeout)"""
-        if not isinstance(data, bytes):
-            data = data.encode()
-            
-        tentativas = 0
-        max_tentativas = 10
-        
-        logging.debug(f"[RDT] Iniciando envio de {len(data)} bytes, seq={self.send_seq_num}")
-        
-        while tentativas < max_tentativas:
-            tentativas += 1
-            packet = self._make_packet(data)
-            
-            try:
-                if not self._send_with_loss(packet):
-                    logging.info(f"[RDT] Pacote perdido (simulação), tentativa {tentativas}")
-                    time.sleep(self.timeout)
-                    continue
-            except ConnectionResetError:
+    def _sendto(self, packet):
+        enviados = self.sock.sendto(packet, self.remote_addr)
+        self.metricas.pacotes_enviados += 1
+        self.metricas.bytes_enviados += enviados
+        return enviados
+
+    def _send_ack(self, seq):
+        try:
+            ack = self._make_ack(seq)
+            self._sendto(ack)
+            gravador.registrar(self.remote_addr, seq, TYPE_ACK, len(ack), "enviado")
+        except Exception as e:
+            logging.error(f"[RDT] Erro enviando ACK: {e}")
+
+    def _transmit(self, seq, packet):
+        """Envia pacote e arma o timer individual dele (perda simulada espera o timer)"""
+        agora = time.time()
+        self._in_flight[seq] = [packet, agora, 1, agora + self.rto, self._backoffs]
+        if self.ao_transmitir is not None:
+            self.ao_transmitir(self)
+        self._send_with_loss(packet, seq)
+
+    def _window_full(self):
+        """A janela vai da base (menor seq não confirmado) até base + window_size"""
+        if not self._in_flight:
+            return False
+        if self.mode == MODE_STOP_AND_WAIT:
+            return True
+        return self.send_seq_num >= min(self._in_flight) + self.window_size
+
+    def _next_deadline(self):
+        """Segundos até o próximo timer de retransmissão expirar (None se nada em voo)"""
+        if not self._in_flight:
+            return None
+        primeiro = min(entrada[3] for entrada in self._in_flight.values())
+        return max(0.0, primeiro - time.time())
+
+    def _update_rto(self, amostra):
+        """Atualiza SRTT/RTTVAR com uma amostra de RTT e recalcula o RTO"""
+        if self.srtt is None:
+            self.srtt = amostra
+            self.rttvar = amostra / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - amostra)
+            self.srtt = 0.875 * self.srtt + 0.125 * amostra
+        self.rto = min(RTO_MAX, max(RTO_MIN, self.srtt + 4 * self.rttvar))
+
+    def _retransmit_expired(self):
+        """Retransmite apenas os pacotes cujo timer expirou"""
+        agora = time.time()
+        expirados = [(seq, entrada) for seq, entrada in self._in_flight.items() if entrada[3] <= agora]
+        if not expirados:
+            return
+
+        # Backoff exponencial uma vez por episódio de perda: pacotes armados antes da
+        # última duplicação já são desse episódio (na janela vários expiram em sequência)
+        # e não dobram de novo. A próxima amostra de RTT válida recalcula o rto (_update_rto).
+        if any(entrada[4] == self._backoffs for _, entrada in expirados):
+            self.rto = min(RTO_MAX, self.rto * 2)
+            self._backoffs += 1
+        for seq, entrada in expirados:
+            if entrada[2] >= self.max_tentativas:
+                gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(entrada[0]), "esgotado")
+                self._in_flight.clear()
+                raise Exception(f"Falha ao enviar após {self.max_tentativas} tentativas")
+            entrada[1] = agora
+            entrada[2] += 1
+            entrada[3] = agora + self.rto
+            entrada[4] = self._backoffs
+            self.metricas.retransmissoes += 1
+            self._send_with_loss(entrada[0], seq, "retransmitido")
+
+    def _handle_ack(self, seq):
+        if seq not in self._in_flight:
+            gravador.registrar(self.remote_addr, seq, TYPE_ACK, 0, "inesperado")
+            return
+        entrada = self._in_flight.pop(seq)
+        # Regra de Karn: pacote retransmitido não gera amostra de RTT
+        if entrada[2] == 1:
+            amostra = time.time() - entrada[1]
+            self._update_rto(amostra)
+            self.metricas.rtt.observar(amostra)
+        gravador.registrar(self.remote_addr, seq, TYPE_ACK, 0, "confirmado")
+        if self.mode == MODE_STOP_AND_WAIT:
+            self.send_seq_num = 1 - seq
+
+    def _read_inbox(self, espera):
+        try:
+            packet = self.inbox.get(timeout=espera)
+            while True:
+                self._delivered.extend(self.process_packet(packet))
+                packet = self.inbox.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _read_datagrams(self, espera):
+        """Lê todos os datagramas disponíveis, esperando até `espera` segundos pelo primeiro"""
+        if self.inbox is not None:
+            self._read_inbox(espera)
+            return
+        ready = select.select([self.sock], [], [], espera)
+        while ready[0]:
+            packet, addr = self.sock.recvfrom(BUFFER_SIZE)
+            if addr != self.remote_addr:
+                gravador.registrar(addr, None, None, len(packet), "endereco_errado")
+            else:
+                self._delivered.extend(self.process_packet(packet))
+            ready = select.select([self.sock], [], [], 0)
+
+    def _service(self, espera, tolerar_erros=False):
+        if self._descarregar is not None:
+            self._descarregar()
+        try:
+            self._read_datagrams(espera)
+        except socket.timeout:
+            pass
+        except Exception as e:
+            if not tolerar_erros:
                 raise
-            
-            logging.debug(f"[RDT] Aguardando ACK para seq={self.send_seq_num}, tentativa {tentativas}")
-            
-            start_time = time.time()
-            while time.time() - start_time < self.timeout:
-                try:
-                    ready = select.select([self.sock], [], [], 0.1)
-                    if ready[0]:
-                        ack_data, addr = self.sock.recvfrom(1024)
-                        
-                        if addr != self.remote_addr:
-                            logging.debug(f"[RDT] ACK de endereço errado: {addr}")
-                            continue
-                            
-                        if len(ack_data) == 1:
-                            ack_seq = ack_data[0]
-                            if ack_seq == self.send_seq_num:
-                                logging.info(f"[RDT] ACK recebido para seq={self.send_seq_num}")
-                                self.send_seq_num = 1 - self.send_seq_num
-                                return
-                            else:
-                                logging.debug(f"[RDT] ACK com seq errado: {ack_seq}, esperado: {self.send_seq_num}")
-                        else:
-                            logging.debug(f"[RDT] Pacote recebido não é ACK (tamanho: {len(ack_data)} bytes)")
-                            
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    logging.error(f"[RDT] Erro recebendo ACK: {e}")
-                    break
-            
-            logging.warning(f"[RDT] Timeout! Retransmitindo (seq={self.send_seq_num}, tentativa {tentativas})")
-        
-        # Se chegou aqui, excedeu o número máximo de tentativas
-        raise Exception(f"Falha ao enviar após {max_tentativas} tentativas")
+            logging.error(f"[RDT] Erro recebendo ACK: {e}")
+        self._retransmit_expired()
+
+    def process_packet(self, packet):
+        """Processa um datagrama do peer (lido por quem for dono do socket).
+
+        Trata ACKs, envia ACKs para pacotes de dados e retorna a lista de
+        mensagens entregues em ordem (vazia para ACK, duplicado ou corrompido).
+        """
+        metricas = self.metricas
+        metricas.pacotes_recebidos += 1
+        metricas.bytes_recebidos += len(packet)
+        decoded = self._decode(packet)
+        if decoded is None:
+            metricas.invalidos += 1
+            gravador.registrar(self.remote_addr, None, None, len(packet), "invalido")
+            return []
+
+        tipo, seq, data, checksum_ok, checksum_id, fragmento = decoded
+        if checksum_ok:
+            self.last_active = time.time()
+        else:
+            metricas.falhas_checksum += 1
+            gravador.registrar(self.remote_addr, seq, tipo, len(packet), "checksum_errado")
+        if tipo == TYPE_ACK:
+            if checksum_ok:
+                self._handle_ack(seq)
+            return []
+        if tipo == TYPE_HEARTBEAT:
+            if checksum_ok:
+                self.peer_heartbeat = True
+                gravador.registrar(self.remote_addr, None, TYPE_HEARTBEAT, len(packet), "recebido")
+            return []
+
+        if checksum_id is None and self.mode == MODE_WINDOW:
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "legado_ignorado")
+            return []
+
+        if checksum_ok:
+            # Formato e checksum são escolhidos por conexão: responde como o peer fala
+            self.legacy = checksum_id is None
+            if not self.legacy and checksum_id != self.checksum_id:
+                self._set_checksum(checksum_id)
+
+        if self.mode == MODE_WINDOW:
+            return self._receive_window(seq, data, checksum_ok, fragmento)
+
+        if not checksum_ok:
+            # RDT 3.0: reconhece de novo o último pacote correto
+            self._send_ack(1 - self.recv_seq_num)
+            return []
+
+        self._send_ack(seq)
+        if seq != self.recv_seq_num:
+            self.metricas.duplicados += 1
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "duplicado")
+            return []
+
+        gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(packet), "aceito")
+        self.recv_seq_num = 1 - self.recv_seq_num
+        return self._reassemble(data, fragmento)
+
+    def _receive_window(self, seq, data, checksum_ok, fragmento):
+        """Receptor Selective Repeat: ACK individual e buffer fora de ordem"""
+        if not checksum_ok:
+            return []  # já registrado em process_packet
+
+        if seq < self.recv_seq_num:
+            self._send_ack(seq)
+            self.metricas.duplicados += 1
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(data), "duplicado")
+            return []
+
+        if seq >= self.recv_seq_num + self.window_size:
+            gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(data), "fora_da_janela")
+            return []
+
+        gravador.registrar(self.remote_addr, seq, TYPE_DATA, len(data), "aceito")
+        self._send_ack(seq)
+        self._out_of_order.setdefault(seq, (data, fragmento))
+
+        entregues = []
+        while self.recv_seq_num in self._out_of_order:
+            entregues.extend(self._reassemble(*self._out_of_order.pop(self.recv_seq_num)))
+            self.recv_seq_num += 1
+        return entregues
+
+    def _reassemble(self, data, fragmento):
+        """Entrega um pacote já em ordem: mensagem inteira sai direto e fragmento é
+        copiado para o buffer pré-alocado da mensagem até ela ficar completa.
+
+        Retorna a lista de mensagens completas (bytes, ou bytearray se remontada).
+        """
+        if not fragmento:
+            return [bytes(data)]
+        if len(data) < _FRAGMENT.size:
+            gravador.registrar(self.remote_addr, None, TYPE_DATA, len(data), "fragmento_invalido")
+            return []
+
+        total, offset = _FRAGMENT.unpack_from(data)
+        pedaco = data[_FRAGMENT.size:]
+        if offset == 0:
+            if total > MAX_MESSAGE_SIZE:
+                logging.warning(f"[RDT] Mensagem fragmentada de {total} bytes excede o limite, descartada")
+                self._remontagem = None
+                return []
+            self._remontagem = memoryview(bytearray(total))
+            self._remontado = 0
+        elif self._remontagem is None or total != len(self._remontagem) or offset != self._remontado:
+            gravador.registrar(self.remote_addr, None, TYPE_DATA, len(data), "fragmento_fora_de_ordem")
+            self._remontagem = None
+            return []
+
+        fim = offset + len(pedaco)
+        if fim > total:
+            gravador.registrar(self.remote_addr, None, TYPE_DATA, len(data), "fragmento_invalido")
+            self._remontagem = None
+            return []
+
+        self._remontagem[offset:fim] = pedaco
+        self._remontado = fim
+        if fim < total:
+            return []
+
+        mensagem = self._remontagem.obj
+        self._remontagem.release()
+        self._remontagem = None
+        return [mensagem]
+
+    def poll(self):
+        """Processa sem bloquear os ACKs já recebidos e retransmite pacotes com timer expirado.
+
+        Com inbox só a caixa de entrada é lida, então o dono do socket
+        compartilhado pode chamar à vontade.
+        """
+        self._service(0, tolerar_erros=True)
+
+    def heartbeat(self):
+        """Envia um keepalive ao peer (peers no formato legado não entendem e não recebem)"""
+        if self.legacy:
+            return
+        try:
+            pacote = self._build_packet(0, b"", TYPE_HEARTBEAT)
+            self._sendto(pacote)
+            gravador.registrar(self.remote_addr, None, TYPE_HEARTBEAT, len(pacote), "enviado")
+        except Exception as e:
+            logging.error(f"[RDT] Erro enviando heartbeat: {e}")
+
+    def is_inativo(self, limite):
+        """Peer que manda heartbeats mas está calado há mais de `limite` segundos"""
+        return self.peer_heartbeat and time.time() - self.last_active > limite
+
+    def is_pending(self, seq):
+        """Indica se o pacote `seq` (ou algum anterior a ele) ainda aguarda ACK"""
+        if self.mode == MODE_WINDOW:
+            return bool(self._in_flight) and min(self._in_flight) <= seq
+        return seq in self._in_flight
+
+    def flush(self):
+        """Bloqueia até todos os pacotes em voo serem confirmados"""
+        while self._in_flight:
+            self._service(self._next_deadline(), tolerar_erros=True)
+
+    def begin_send(self, data):
+        """Coloca os dados na rede sem esperar o ACK e retorna o seq usado
+        (o do último fragmento, se a mensagem foi fragmentada).
+
+        Só bloqueia enquanto a janela estiver cheia (no stop-and-wait, enquanto
+        houver um pacote anterior em voo).
+        """
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.encode()
+
+        for payload, tipo in self._fragments(data):
+            while self._window_full():
+                self._service(self._next_deadline(), tolerar_erros=True)
+
+            seq = self.send_seq_num
+            self._transmit(seq, self._build_packet(seq, payload, tipo))
+
+            if self.mode == MODE_WINDOW:
+                self.send_seq_num += 1
+        return seq
+
+    def send(self, data):
+        """Envia dados usando RDT 3.0 (com ACK e timeout).
+
+        No stop-and-wait retorna após o ACK. No modo janela só bloqueia
+        enquanto a janela estiver cheia; use flush() para aguardar todos os ACKs.
+        """
+        inicio = time.perf_counter()
+        self.begin_send(data)
+        if self.mode != MODE_WINDOW:
+            self.flush()
+        self.metricas.bloqueio_envio.observar(time.perf_counter() - inicio)
 
     def recv(self, timeout=None):
         """Recebe dados usando RDT 3.0
-        
+
         Args:
             timeout: Timeout em segundos. Se None, bloqueia indefinidamente.
                     Se especificado, retorna None após timeout.
         """
-        original_timeout = self.sock.gettimeout()
-        if timeout is not None:
-            self.sock.settimeout(timeout)
-        elif original_timeout is None:
-            self.sock.settimeout(self.timeout)
-        
-        start_time = time.time()
+        if self._delivered:
+            return self._delivered.popleft()
+
+        limite = None if timeout is None else time.time() + timeout
         while True:
+            espera = self._next_deadline()
+            if limite is not None:
+                restante = max(0.0, limite - time.time())
+                espera = restante if espera is None else min(espera, restante)
+
             try:
-                if timeout is not None:
-                    elapsed = time.time() - start_time
-                    if elapsed >= timeout:
-                        self.sock.settimeout(original_timeout)
-                        return None
-                
-                logging.debug(f"[RDT] Aguardando dados, esperando seq={self.recv_seq_num}")
-                
-                packet, addr = self.sock.recvfrom(1024)
-                
-                if addr != self.remote_addr:
-                    logging.debug(f"[RDT] Pacote de endereço errado: {addr}")
-                    continue
-                
-                seq, data, checksum_ok = self.parse_packet(packet)
-                
-                if seq is None:
-                    logging.debug("[RDT] Pacote inválido, ignorando")
-                    continue
-                
-                logging.debug(f"[RDT] Pacote recebido: seq={seq}, checksum_ok={checksum_ok}, data_len={len(data)}")
-                
-                ack_packet = seq.to_bytes(1, 'big')
-                try:
-                    self.sock.sendto(ack_packet, addr)
-                    logging.debug(f"[RDT] ACK enviado para seq={seq} (1 byte)")
-                except Exception as e:
-                    logging.error(f"[RDT] Erro enviando ACK: {e}")
-                
-                if checksum_ok and seq == self.recv_seq_num:
-                    logging.info(f"[RDT] Pacote aceito: seq={seq}")
-                    self.recv_seq_num = 1 - self.recv_seq_num
-                    if timeout is not None or original_timeout is None:
-                        self.sock.settimeout(original_timeout)
-                    return data
-                else:
-                    if not checksum_ok:
-                        logging.info(f"[RDT] Pacote com checksum errado descartado (seq={seq})")
-                    else:
-                        logging.info(f"[RDT] Pacote duplicado (seq={seq}), ignorado")
-                        
-            except socket.timeout:
-                if timeout is not None:
-                    self.sock.settimeout(original_timeout)
-                    return None
-                continue
+                self._service(espera)
             except Exception as e:
-                if timeout is not None or original_timeout is None:
-                    self.sock.settimeout(original_timeout)
                 logging.error(f"[RDT] Erro na recepção: {e}")
-                raise
\ No newline at end of file
+                raise
+
+            if self._delivered:
+                return self._delivered.popleft()
+            if limite is not None and time.time() >= limite:
+                return None
@@ -0,0 +1,136 @@
+# network/rdt_async.py
+import asyncio
+import logging
+import time
+from .rdt import RDT, MODE_WINDOW
+
+
+def send_to_all_async(rdts, data):
+    """Fan-out do servidor asyncio com a mesma mensagem para todos (ver send_batch_async)"""
+    return send_batch_async({rdt: [data] for rdt in rdts})
+
+
+def send_batch_async(envios):
+    """Fan-out do servidor asyncio: agenda os envios de {rdt: [dados, ...]} e retorna na hora.
+
+    Os peers correm em paralelo no event loop e cada um recebe a sua lista em
+    ordem; o resultado fica no future de cada peer ({rdt: Future}) e falhas
+    também chegam por AsyncRDT.ao_falhar.
+    """
+    return {
+        rdt: asyncio.gather(*(rdt.send(data) for data in dados), return_exceptions=True)
+        for rdt, dados in envios.items()
+    }
+
+
+class AsyncRDT(RDT):
+    """RDT para o servidor asyncio: envios são coroutines e os ACKs chegam
+    pelo DatagramProtocol (process_packet), sem nenhuma chamada bloqueante.
+
+    O formato dos pacotes, os modos de transferência e o receptor são os
+    mesmos do RDT síncrono.
+    """
+
+    def __init__(self, transport, remote_addr, **kwargs):
+        super().__init__(None, remote_addr, **kwargs)
+        self.transport = transport
+        self.ao_falhar = None  # callback(exc) quando um envio esgota as tentativas
+        self._loop = asyncio.get_running_loop()
+        self._confirmacoes = {}  # seq -> Future resolvido no ACK
+        self._ordem = asyncio.Lock()  # mantém a ordem de transmissão entre tarefas
+        self._janela_mudou = asyncio.Event()
+        self._timer = None
+        self._tarefas = set()
+
+    def _sendto(self, packet):
+        self.transport.sendto(packet, self.remote_addr)
+        self.metricas.pacotes_enviados += 1
+        self.metricas.bytes_enviados += len(packet)
+        return len(packet)
+
+    async def enviar(self, data):
+        """Envia (fragmentando se preciso) e retorna quando todos os ACKs chegarem
+        (levanta após max_tentativas)"""
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.encode()
+
+        inicio = time.perf_counter()
+        confirmacoes = []
+        async with self._ordem:
+            for payload, tipo in self._fragments(data):
+                while self._window_full():
+                    self._janela_mudou.clear()
+                    await self._janela_mudou.wait()
+                if confirmacoes and confirmacoes[-1].done() and confirmacoes[-1].exception() is not None:
+                    break  # um fragmento anterior esgotou as tentativas
+
+                seq = self.send_seq_num
+                confirmacao = self._loop.create_future()
+                self._confirmacoes[seq] = confirmacao
+                confirmacoes.append(confirmacao)
+                self._transmit(seq, self._build_packet(seq, payload, tipo))
+                if self.mode == MODE_WINDOW:
+                    self.send_seq_num += 1
+                self._armar_timer()
+
+        await asyncio.gather(*confirmacoes)
+        self.metricas.bloqueio_envio.observar(time.perf_counter() - inicio)
+
+    def send(self, data):
+        """API síncrona usada por GameService/ConnectionManager: agenda o envio e retorna"""
+        tarefa = self._loop.create_task(self.enviar(data))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._fim_envio)
+        return tarefa
+
+    async def aguardar_envios(self):
+        """Aguarda todos os envios agendados com send()"""
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
+
+    def _fim_envio(self, tarefa):
+        self._tarefas.discard(tarefa)
+        if tarefa.cancelled():
+            return
+        erro = tarefa.exception()
+        if erro is not None:
+            logging.error(f"[RDT] Envio para {self.remote_addr} falhou: {erro}")
+            if self.ao_falhar:
+                self.ao_falhar(erro)
+
+    def _handle_ack(self, seq):
+        estava_em_voo = seq in self._in_flight
+        super()._handle_ack(seq)
+        if not estava_em_voo:
+            return
+        confirmacao = self._confirmacoes.pop(seq, None)
+        if confirmacao is not None and not confirmacao.done():
+            confirmacao.set_result(True)
+        self._janela_mudou.set()
+        self._armar_timer()
+
+    def _armar_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        espera = self._next_deadline()
+        self._timer = None if espera is None else self._loop.call_later(espera, self._ao_expirar)
+
+    def _ao_expirar(self):
+        self._timer = None
+        try:
+            self._retransmit_expired()
+        except Exception as e:
+            for confirmacao in self._confirmacoes.values():
+                if not confirmacao.done():
+                    confirmacao.set_exception(e)
+            self._confirmacoes.clear()
+            self._janela_mudou.set()
+        self._armar_timer()
+
+    def fechar(self):
+        """Cancela timer e envios pendentes (peer removido)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for tarefa in list(self._tarefas):
+            tarefa.cancel()
@@ -0,0 +1,141 @@
+# server_async.py
+import asyncio
+import logging
+from network.connection_manager import ConnectionManager
+from network.rdt_async import AsyncRDT, send_batch_async
+from services.room_manager import RoomManager
+from server_udp import UDPServer
+from utils.config import SERVER_HOST, SERVER_PORT, RTO_MAX, ROOM_MAX_PLAYERS, STATS_PORT, LOG_FORMAT
+
+
+class _ProtocoloServidor(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server._despachar(data, addr)
+
+    def error_received(self, exc):
+        # ICMP "port unreachable" de um cliente que caiu; o RDT cuida da retransmissão
+        pass
+
+
+class AsyncUDPServer(UDPServer):
+    """Servidor HuntCin sobre asyncio (python main.py server --async).
+
+    Reaproveita o tratamento de login/comandos do UDPServer, mas cada envio
+    RDT é uma coroutine (AsyncRDT) e as pausas do GameService viram
+    callbacks do event loop, então nada bloqueia o loop.
+    """
+
+    def __init__(self, reuse_port=False, relatar=None, contatos="contatos.txt", stats_porta=STATS_PORT):
+        self.reuse_port = reuse_port
+        self.relatar = relatar
+        self.arquivo_contatos = contatos
+        self.stats_porta = stats_porta
+        self.transport = None
+        self.loop = None
+        self.connection_manager = ConnectionManager(fan_out=send_batch_async, ao_falhar=self._desconectar)
+        self.salas = RoomManager(self.connection_manager, agendar=self._agendar, max_jogadores=ROOM_MAX_PLAYERS)
+        self.rdt_instances = {}
+
+    def run(self):
+        """Loop principal do servidor"""
+        try:
+            asyncio.run(self._executar())
+        except KeyboardInterrupt:
+            pass
+
+    async def _executar(self):
+        self.loop = asyncio.get_running_loop()
+        self.transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _ProtocoloServidor(self),
+            local_addr=(SERVER_HOST, SERVER_PORT),
+            reuse_port=self.reuse_port or None,
+        )
+        print(f"🎮 Servidor HuntCin UDP (asyncio) iniciado em {SERVER_HOST}:{SERVER_PORT}")
+
+        self.connection_manager.carregar_contatos(self.arquivo_contatos)
+        self._iniciar_stats()
+        self._instalar_gravador()
+        self._agendar_remocao_inativos()
+        self._agendar_relatorio()
+
+        print("\n🎮 Servidor HuntCin UDP - PRONTO")
+        print(f"Aguardando jogadores (mínimo: 2)...")
+        print("=" * 50)
+
+        try:
+            # Tudo acontece em callbacks: datagramas, fim de turno e reinício (call_later)
+            await self.loop.create_future()
+        finally:
+            self.transport.close()
+
+    def metricas_texto(self):
+        # A página é montada dentro do event loop, entre dois callbacks
+        return asyncio.run_coroutine_threadsafe(self._montar_metricas(), self.loop).result(timeout=5)
+
+    async def _montar_metricas(self):
+        return UDPServer.metricas_texto(self)
+
+    def _profundidade_fila(self):
+        return None  # sem fila: o event loop entrega cada datagrama direto
+
+    def _contadores_io(self):
+        return {}  # a E/S é do transporte do asyncio
+
+    def _agendar(self, atraso, callback):
+        return self.loop.call_later(atraso, self._executar_no_lote, callback)
+
+    def _executar_no_lote(self, callback):
+        with self.connection_manager.lote():
+            callback()
+
+    def _despachar(self, data, addr):
+        # Cada datagrama é um tick: as mensagens geradas saem agrupadas por jogador
+        with self.connection_manager.lote():
+            try:
+                if self._is_jogador_conectado(addr):
+                    self._processar_comando_jogo(data, addr)
+                else:
+                    self._processar_login(data, addr)
+            except Exception as e:
+                print(f"❌ Erro inesperado: {e}")
+
+    def _criar_rdt(self, addr):
+        rdt = AsyncRDT(self.transport, addr)
+        rdt.ao_falhar = lambda erro: self._falha_envio(addr)
+        return rdt
+
+    def _falha_envio(self, addr):
+        jogador_nome, _ = self.connection_manager.get_jogador_por_addr(addr)
+        print(f"❌ Falha de entrega para {addr}")
+        if jogador_nome:
+            self._desconectar(jogador_nome, addr)
+        else:
+            self._descartar_rdt(addr)
+
+    def _descartar_rdt(self, addr):
+        rdt = self.rdt_instances.get(addr)
+        if rdt is not None:
+            self.loop.create_task(self._encerrar_rdt(addr, rdt))
+
+    async def _encerrar_rdt(self, addr, rdt):
+        # O RDT continua registrado até a resposta de logout ser confirmada: os
+        # ACKs do cliente precisam chegar nele, e não num RDT novo de login
+        try:
+            await asyncio.wait_for(asyncio.shield(rdt.aguardar_envios()), RTO_MAX * rdt.max_tentativas)
+        except asyncio.TimeoutError:
+            pass
+        if self.rdt_instances.get(addr) is rdt and not self._is_jogador_conectado(addr):
+            del self.rdt_instances[addr]
+            rdt.fechar()
+
+    def _enviar_bruto(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
+    server = AsyncUDPServer()
+    server.run()
@@ -1,112 +1,377 @@
 # server_udp.py
 from network.connection_manager import ConnectionManager
-from services.game_services import GameService
-from network.rdt import RDT
+from services.room_manager import RoomManager
+from network.rdt import RDT, send_batch
+from network.demultiplexer import PacketDemultiplexer
+from network.batch_io import BatchReceiver, BatchSender
+from network.metrics import StatsServer, renderizar_prometheus
+from network.flight_recorder import gravador
+from network.protocol import OP_COMANDO, OP_ENTRAR, OP_LOGIN, decodificar, is_binario
 from models.player import Player
+import logging
+import os
 import socket
 import time
-from utils.config import SERVER_HOST, SERVER_PORT, BUFFER_SIZE
+from collections import deque
+from utils.agendador import Agendador
+from utils.config import (
+    SERVER_HOST, SERVER_PORT, HEARTBEAT_INTERVAL, IDLE_TIMEOUT, ROOM_MAX_PLAYERS, WORKER_STATS_INTERVAL, STATS_PORT,
+    LOG_FORMAT, UDP_IO, IO_BATCH_SIZE
+)
 
 class UDPServer:
-    def __init__(self):
+    def __init__(self, reuse_port=False, relatar=None, contatos="contatos.txt", stats_porta=STATS_PORT, io=UDP_IO):
+        """reuse_port: divide a porta com outros processos (SO_REUSEPORT, modo --workers);
+        relatar(estatisticas) é chamado a cada WORKER_STATS_INTERVAL segundos;
+        contatos: arquivo com os jogadores cadastrados;
+        stats_porta: porta local da página de métricas (None desliga);
+        io: "simples" ou "lote" (datagramas em lote, ver UDP_IO em utils/config.py)"""
+        if io not in ("simples", "lote"):
+            raise ValueError(f"E/S inválida: {io!r} (use 'simples' ou 'lote')")
+        self.relatar = relatar
+        self.arquivo_contatos = contatos
+        self.stats_porta = stats_porta
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.bind((SERVER_HOST, SERVER_PORT))
         self.sock.settimeout(1.0)
+        # Modo lote: a thread do demultiplexador lê vários datagramas por chamada e os
+        # RDTs enfileiram os envios em self.saida, descarregada uma vez por iteração
+        self.receptor = BatchReceiver(self.sock, IO_BATCH_SIZE) if io == "lote" else None
+        self.saida = BatchSender(self.sock) if io == "lote" else None
+        self.demux = PacketDemultiplexer(self.sock, receptor=self.receptor)
         
-        self.connection_manager = ConnectionManager()
-        self.game_service = GameService(self.connection_manager)
+        self.connection_manager = ConnectionManager(
+            fan_out=lambda envios: send_batch(
+                envios, aguardar_acks=self.demux.aguardar_acks, inativo_apos=IDLE_TIMEOUT
+            ),
+            despedida=self._despedir,
+            ao_falhar=self._desconectar,
+        )
+        # Eventos do jogo (fim de turno, reinício) rodam no próprio loop de recepção
+        self.agendador = Agendador()
+        self.salas = RoomManager(
+            self.connection_manager, agendar=self.agendador.agendar, max_jogadores=ROOM_MAX_PLAYERS
+        )
         self.rdt_instances = {}
+        self._em_voo = set()  # endereços cujo RDT tem pacotes aguardando ACK
+        self._despedidas = {}  # addr -> deque de datagramas de despedida que ainda não couberam na janela
+        self._encerrando = set()  # endereços cujo RDT sai quando terminar de enviar (logout, queda)
         
         print(f"🎮 Servidor HuntCin UDP iniciado em {SERVER_HOST}:{SERVER_PORT}")
+        if self.saida is not None:
+            print(f"📦 E/S em lote: {'recvmmsg/sendmmsg' if self.saida.mmsg else 'recvfrom/sendto'}, "
+                  f"até {IO_BATCH_SIZE} datagramas por leitura")
     
     def run(self):
         """Loop principal do servidor"""
-        self.connection_manager.carregar_contatos()
+        self.connection_manager.carregar_contatos(self.arquivo_contatos)
         
         print("\n🎮 Servidor HuntCin UDP - PRONTO")
         print(f"Aguardando jogadores (mínimo: 2)...")
         print("=" * 50)
         
+        self.demux.iniciar()
+        self._iniciar_stats()
+        self._instalar_gravador()
+        self._agendar_remocao_inativos()
+        self._agendar_relatorio()
         while True:
-            try:
-                data, addr = self.sock.recvfrom(BUFFER_SIZE)
+            # Cada iteração é um tick: as mensagens geradas saem agrupadas por jogador
+            with self.connection_manager.lote():
+                try:
+                    prazos = [p for p in (self.agendador.proximo_prazo(), self._prazo_retransmissao()) if p is not None]
+                    data, addr = self.demux.recvfrom(timeout=min(prazos + [1.0]))
+                    self._tratar_datagrama(data, addr)
+                    if self.saida is not None:
+                        # E/S em lote: o que já chegou entra no mesmo tick
+                        for data, addr in self.demux.drenar(IO_BATCH_SIZE - 1):
+                            self._tratar_datagrama(data, addr)
+                        
+                except socket.timeout:
+                    pass
+                except Exception as e:
+                    print(f"❌ Erro inesperado: {e}")
                 
-                if self._is_jogador_conectado(addr):
-                    self._processar_comando_jogo(data, addr)
-                else:
-                    self._processar_login(data, addr)
-                    
-            except socket.timeout:
-                self.game_service.tratar_timeout_turno()
+                try:
+                    self.agendador.executar_vencidos()
+                except Exception as e:
+                    print(f"❌ Erro em evento agendado: {e}")
+            
+            self._servir_rdts()
+            if self.saida is not None:
+                # ACKs e retransmissões da iteração saem numa só chamada
+                self.saida.descarregar()
+    
+    def _tratar_datagrama(self, data, addr):
+        if self._is_jogador_conectado(addr):
+            self._processar_comando_jogo(data, addr)
+        else:
+            self._processar_login(data, addr)
+    
+    def _servir_rdts(self):
+        """Processa ACKs/heartbeats que chegaram e retransmite pacotes cujo timer
+        expirou; só visita os RDTs com algo a fazer, não todos os jogadores"""
+        enderecos = self.demux.com_controle()
+        enderecos.update(self._em_voo)
+        enderecos.update(self._encerrando)
+        for addr in enderecos:
+            rdt = self.rdt_instances.get(addr)
+            if rdt is None:
+                self._em_voo.discard(addr)
+                self._encerrando.discard(addr)
                 continue
+            try:
+                rdt.poll()
+                self._continuar_despedida(addr, rdt)
             except Exception as e:
-                print(f"❌ Erro inesperado: {e}")
+                print(f"❌ Falha de entrega para {addr}: {e}")
+                self._despedidas.pop(addr, None)
+                jogador_nome, _ = self.connection_manager.get_jogador_por_addr(addr)
+                if jogador_nome:
+                    self._desconectar(jogador_nome, addr)
+                else:
+                    self._remover_rdt(addr)
                 continue
+            if rdt._in_flight:
+                continue
+            self._em_voo.discard(addr)
+            if addr in self._encerrando and addr not in self._despedidas:
+                if self._is_jogador_conectado(addr):
+                    self._encerrando.discard(addr)  # logou de novo antes de o RDT sair
+                else:
+                    self._remover_rdt(addr)
+    
+    def _despedir(self, envios):
+        """Envio de despedida do ConnectionManager (logout, login recusado): os pacotes
+        vão para a rede sem esperar o ACK, e _servir_rdts cuida das retransmissões e
+        do que ainda não coube na janela. Um cliente que sumiu não trava o loop."""
+        for rdt, dados in envios.items():
+            addr = rdt.remote_addr
+            self._despedidas.setdefault(addr, deque()).extend(dados)
+            try:
+                self._continuar_despedida(addr, rdt)
+            except Exception as e:
+                print(f"❌ Falha enviando para {addr}: {e}")
+                self._despedidas.pop(addr, None)
+        return {rdt: None for rdt in envios}
+    
+    def _continuar_despedida(self, addr, rdt):
+        fila = self._despedidas.get(addr)
+        if fila is None:
+            return
+        while fila and not rdt._window_full():
+            rdt.begin_send(fila.popleft())
+        if not fila:
+            del self._despedidas[addr]
+    
+    def _prazo_retransmissao(self):
+        """Segundos até o próximo timer de retransmissão (None se nada em voo)"""
+        prazos = [
+            rdt._next_deadline()
+            for rdt in map(self.rdt_instances.get, self._em_voo)
+            if rdt is not None and rdt._in_flight
+        ]
+        return min(prazos, default=None)
+    
+    def _agendar(self, atraso, callback):
+        return self.agendador.agendar(atraso, callback)
+    
+    def _agendar_remocao_inativos(self):
+        self._agendar(HEARTBEAT_INTERVAL, self._remover_inativos)
+    
+    def _remover_inativos(self):
+        """Remove jogadores que pararam de mandar heartbeat (cliente caiu)"""
+        # Reagenda antes: um erro ao remover alguém não pode desligar a varredura
+        self._agendar_remocao_inativos()
+        for jogador_nome, addr in self.connection_manager.inativos(IDLE_TIMEOUT):
+            print(f"💤 {jogador_nome} sem sinal há mais de {IDLE_TIMEOUT}s, removendo")
+            try:
+                self._desconectar(jogador_nome, addr)
+            except Exception as e:
+                print(f"❌ Erro removendo {jogador_nome}: {e}")
+    
+    def estatisticas(self):
+        """Contadores deste processo (agregados pelo supervisor no modo --workers)"""
+        salas = list(self.salas.salas.values())
+        return {
+            'pid': os.getpid(),
+            'jogadores': self.connection_manager.get_qtd_jogadores(),
+            'salas': len(salas),
+            'partidas': sum(1 for sala in salas if sala.game_service.jogo_iniciado),
+            'rdts': len(self.rdt_instances),
+        }
+    
+    def _iniciar_stats(self):
+        if self.stats_porta is None:
+            return
+        try:
+            StatsServer(self.stats_porta, self.metricas_texto, paginas={"/eventos": gravador.texto}).iniciar()
+            print(f"📈 Métricas em http://127.0.0.1:{self.stats_porta}/metrics (eventos de pacote em /eventos)")
+        except OSError as e:
+            print(f"⚠️ Não foi possível abrir a página de métricas na porta {self.stats_porta}: {e}")
+    
+    def _instalar_gravador(self):
+        """kill -USR1 <pid> grava os últimos eventos de pacote do RDT num arquivo"""
+        if gravador.instalar_sinal():
+            print(f"🛩️ Gravador de voo: kill -USR1 {os.getpid()} grava os últimos eventos de pacote")
+    
+    def metricas_texto(self):
+        """Página de métricas (formato de texto do Prometheus): contadores de cada
+        RDT e do ConnectionManager e o estado do servidor. Roda na thread do
+        StatsServer; só lê cópias dos dicionários do loop principal."""
+        por_addr = self.connection_manager.por_addr
+        rdts = [
+            ({'peer': f"{addr[0]}:{addr[1]}", 'jogador': por_addr.get(addr, "")}, rdt)
+            for addr, rdt in list(self.rdt_instances.items())
+        ]
+        medidores = self.estatisticas()
+        del medidores['pid']
+        fila = self._profundidade_fila()
+        if fila is not None:
+            medidores['fila_entrada'] = fila
+        return renderizar_prometheus(rdts, self.connection_manager.metricas, medidores, self._contadores_io())
+    
+    def _profundidade_fila(self):
+        """Datagramas lidos pelo demultiplexador esperando o loop principal"""
+        return self.demux.entrada.qsize()
+    
+    def _contadores_io(self):
+        """Chamadas de sistema e datagramas da E/S em lote (vazio no modo simples)"""
+        if self.saida is None:
+            return {}
+        return {
+            'io_chamadas_recepcao': self.receptor.chamadas,
+            'io_datagramas_recebidos': self.receptor.datagramas,
+            'io_chamadas_envio': self.saida.chamadas,
+            'io_datagramas_enviados': self.saida.datagramas,
+        }
+    
+    def _agendar_relatorio(self):
+        if self.relatar is not None:
+            self._agendar(WORKER_STATS_INTERVAL, self._relatar)
+    
+    def _relatar(self):
+        try:
+            self.relatar(self.estatisticas())
+        except Exception as e:
+            print(f"❌ Erro enviando estatísticas: {e}")
+        self._agendar_relatorio()
+    
+    def _desconectar(self, jogador_nome, addr):
+        self.salas.sair(jogador_nome)
+        self.connection_manager.remover_conexao(jogador_nome)
+        self._descartar_rdt(addr)
+    
+    def _criar_rdt(self, addr):
+        rdt = RDT(self.sock if self.saida is None else self.saida, addr, inbox=self.demux.registrar(addr))
+        rdt.ao_transmitir = lambda rdt: self._em_voo.add(rdt.remote_addr)
+        return rdt
+    
+    def _descartar_rdt(self, addr):
+        # O RDT continua registrado até a despedida ser confirmada (os ACKs do cliente
+        # precisam chegar nele); _servir_rdts o remove quando não houver mais nada em voo
+        self._encerrando.add(addr)
+    
+    def _remover_rdt(self, addr):
+        self.rdt_instances.pop(addr, None)
+        self._em_voo.discard(addr)
+        self._encerrando.discard(addr)
+        self._despedidas.pop(addr, None)
+        self.demux.remover(addr)
+    
+    def _enviar_bruto(self, data, addr):
+        """Envia datagrama fora do RDT (respostas de erro de login)"""
+        self.sock.sendto(data, addr)
     
     def _is_jogador_conectado(self, addr):
         """Verifica se endereço pertence a jogador conectado"""
-        for conn in self.connection_manager.get_all_connections():
-            if conn['addr'] == addr:
-                return True
-        return False
+        return self.connection_manager.is_addr_conectado(addr)
+    
+    def _interpretar(self, mensagem_bytes):
+        """(opcode, campos) da mensagem do cliente. A binária já vem decodificada pelo
+        protocolo; só o texto de clientes que não falam binário passa pelo parser.
+        Login em texto com formato inválido vem como (OP_LOGIN, None)."""
+        if is_binario(mensagem_bytes):
+            return decodificar(mensagem_bytes)
+        texto = mensagem_bytes.decode('utf-8', errors='ignore').strip()
+        partes = texto.split()
+        if partes and partes[0].lower() == "login":
+            if len(partes) not in (2, 3):
+                return OP_LOGIN, None
+            return OP_LOGIN, (partes[1], partes[2] if len(partes) == 3 else None)
+        if len(partes) == 2 and partes[0].lower() == "join":
+            return OP_ENTRAR, (partes[1],)
+        return OP_COMANDO, (texto.lower(),)
     
     def _processar_login(self, data, addr):
         if addr not in self.rdt_instances:
-            self.rdt_instances[addr] = RDT(self.sock, addr)   
+            self.rdt_instances[addr] = self._criar_rdt(addr)
         try:
             rdt = self.rdt_instances[addr]
             
-            seq, mensagem_bytes, checksum_ok = rdt.parse_packet(data)
-            
-            if seq is None or not checksum_ok:
-                print(f"   ❌ Pacote RDT inválido de {addr}")
-                ack = b'\x00' if seq is None else bytes([seq])
-                self.sock.sendto(ack, addr)
-                return
-            
-            ack_packet = seq.to_bytes(1, 'big')
-            self.sock.sendto(ack_packet, addr)
-            
-            mensagem = mensagem_bytes.decode('utf-8', errors='ignore').strip()
-            print(f"   📩 Login recebido de {addr}: {mensagem}")
+            # ACK, duplicados e checksum são tratados pelo próprio RDT
+            for mensagem_bytes in rdt.process_packet(data):
+                self._tratar_login(mensagem_bytes, addr, rdt)
+                    
+        except Exception as e:
+            print(f"❌ Erro processando login: {e}")
+    
+    def _tratar_login(self, mensagem_bytes, addr, rdt):
+        try:
+            binario = is_binario(mensagem_bytes)
+            opcode, campos = self._interpretar(mensagem_bytes)
             
-            if not mensagem.lower().startswith("login "):
-                erro_msg = "Comando inválido. Use: login <nome>"
-                self.sock.sendto(erro_msg.encode(), addr)
+            if opcode != OP_LOGIN:
+                erro_msg = "Comando inválido. Use: login <nome> [sala]"
+                self._enviar_bruto(erro_msg.encode(), addr)
                 return
             
-            partes = mensagem.split()
-            if len(partes) != 2:
-                erro_msg = "Formato inválido. Use: login <nome>"
-                self.sock.sendto(erro_msg.encode(), addr)
+            if campos is None:
+                erro_msg = "Formato inválido. Use: login <nome> [sala]"
+                self._enviar_bruto(erro_msg.encode(), addr)
                 return
             
-            nome = partes[1]
+            nome, sala_id = campos
+            print(f"   📩 Login recebido de {addr}: {nome}" + (f" (sala {sala_id})" if sala_id else ""))
             
             sucesso, resposta = self.connection_manager.validar_login(nome, addr)
+            if sucesso and sala_id is not None:
+                sala = self.salas.get_sala(sala_id)
+                if sala and sala.is_cheia(self.salas.max_jogadores):
+                    sucesso, resposta = False, f"Sala '{sala_id}' cheia ({self.salas.max_jogadores} jogadores)"
             
             if sucesso:
                 pid = self.connection_manager.get_qtd_jogadores()
                 player = Player(pid, addr, nome=nome)
                 
-                self.connection_manager.adicionar_conexao(nome, addr, rdt, player)
+                self.connection_manager.adicionar_conexao(nome, addr, rdt, player, binario=binario)
                 
                 resposta_final = "você está online!"
-                rdt.send(resposta_final.encode())
+                self.connection_manager.enviar(nome, resposta_final)
                 
                 print(f"✅ {nome} conectado de {addr} (PID: {pid})")
                 
-                if self.game_service.iniciar_jogo():
-                    print("🎮 JOGO INICIADO!")
+                self._entrar_sala(nome, sala_id)
             else:
-                try:
-                    rdt.send(resposta.encode())
-                except:
-                    self.sock.sendto(resposta.encode(), addr)
+                self.connection_manager.enviar_avulso(rdt, resposta, binario=binario)
                     
         except Exception as e:
             print(f"❌ Erro processando login: {e}")
     
+    def _entrar_sala(self, nome, sala_id=None):
+        """Coloca o jogador numa sala (a escolhida ou a primeira com vaga) e tenta iniciar o jogo dela"""
+        sala, erro = self.salas.entrar(nome, sala_id)
+        if sala is None:
+            self.connection_manager.enviar(nome, f"⚠️ {erro}")
+            return
+        
+        self.connection_manager.enviar(nome, f"🚪 Sala {sala.id} ({sala.get_qtd_jogadores()} jogador(es))")
+        print(f"🚪 {nome} entrou na sala {sala.id}")
+        if sala.game_service.iniciar_jogo():
+            print(f"🎮 JOGO INICIADO na sala {sala.id}!")
+    
     def _processar_comando_jogo(self, data, addr):
         """Processa comandos do jogo"""
         try:
@@ -115,49 +380,54 @@ class UDPServer:
             if not jogador_nome or not conn:
                 return
             
-            rdt = conn['rdt']
-            seq, mensagem_bytes, checksum_ok = rdt.parse_packet(data)
+            for mensagem_bytes in conn['rdt'].process_packet(data):
+                self._tratar_comando(mensagem_bytes, addr, jogador_nome, conn)
+                
+        except Exception as e:
+            print(f"❌ Erro processando comando: {e}")
+    
+    def _tratar_comando(self, mensagem_bytes, addr, jogador_nome, conn):
+        try:
+            opcode, campos = self._interpretar(mensagem_bytes)
             
-            if not checksum_ok or seq is None:
-                print(f"   ❌ Pacote RDT inválido de {jogador_nome}")
+            if opcode == OP_ENTRAR:
+                print(f"   📥 Comando de {jogador_nome}: join {campos[0]}")
+                self._entrar_sala(jogador_nome, campos[0])
                 return
-
-            try:
-                ack_packet = seq.to_bytes(1, 'big')
-                self.sock.sendto(ack_packet, addr)
-            except Exception as e:
-                print(f"❌ Erro enviando ACK para {jogador_nome}: {e}")
+            
+            if opcode != OP_COMANDO:
                 return
             
-            comando = mensagem_bytes.decode('utf-8', errors='ignore').strip().lower()
+            comando = campos[0]
             print(f"   📥 Comando de {jogador_nome}: {comando}")
 
-            if comando.lower() == "logout":
-                rdt.send("Logout realizado. Até mais!".encode())
-                self.game_service.remover_jogador(jogador_nome)
-                self.connection_manager.remover_conexao(jogador_nome)
-                if addr in self.rdt_instances:
-                    del self.rdt_instances[addr]
+            if comando == "logout":
+                try:
+                    self.connection_manager.enviar(jogador_nome, "Logout realizado. Até mais!")
+                finally:
+                    self._desconectar(jogador_nome, addr)
                 return
             
-            encontrou_tesouro, resposta, consumiu_turno = self.game_service.processar_comando(jogador_nome, comando)
+            game_service = self.salas.service(jogador_nome)
+            if game_service is None:
+                return
             
-            try:
-                rdt.send(resposta.encode())
-            except ConnectionResetError:
-                print(f"❌ Conexão resetada ao responder {jogador_nome}, removendo jogador")
-                self.game_service.remover_jogador(jogador_nome)
-                self.connection_manager.remover_conexao(jogador_nome)
-                if addr in self.rdt_instances:
-                    del self.rdt_instances[addr]
+            if comando == "resync":
+                game_service.enviar_snapshot(jogador_nome)
                 return
             
+            encontrou_tesouro, resposta, consumiu_turno = game_service.processar_comando(jogador_nome, comando)
+            
+            if resposta is not None:
+                self.connection_manager.enviar(jogador_nome, resposta)
+            
             if encontrou_tesouro:
-                self.game_service.finalizar_vitoria(conn['player'])
+                game_service.finalizar_vitoria(conn['player'])
                 
         except Exception as e:
             print(f"❌ Erro processando comando: {e}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
     server = UDPServer()
     server.run()
\ No newline at end of file
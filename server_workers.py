@@ -0,0 +1,151 @@
+# server_workers.py
+import multiprocessing
+import queue
+import signal
+import socket
+import sys
+import time
+from utils.config import SERVER_HOST, SERVER_PORT, WORKER_STATS_INTERVAL, UDP_IO
+
+
+# Sinais que encerram o supervisor (e os workers com ele), além do Ctrl+C
+_SINAIS_ENCERRAR = [getattr(signal, nome) for nome in ("SIGTERM", "SIGHUP") if hasattr(signal, nome)]
+
+
+def _executar_worker(indice, assincrono, estatisticas, contatos, stats_porta, io):
+    """Corpo de cada processo: um servidor completo (conexões, salas, RDT) na porta compartilhada
+    (a página de métricas de cada worker fica em stats_porta + índice)"""
+    # Herdados do supervisor: no worker, SIGTERM/SIGHUP voltam a só encerrar o processo
+    for sinal in _SINAIS_ENCERRAR:
+        signal.signal(sinal, signal.SIG_DFL)
+    if assincrono:
+        from server_async import AsyncUDPServer
+        classe = AsyncUDPServer
+        opcoes = {}  # a E/S do asyncio é do transporte; `io` vale só para o servidor síncrono
+    else:
+        from server_udp import UDPServer
+        classe = UDPServer
+        opcoes = {'io': io}
+    server = classe(
+        reuse_port=True,
+        relatar=lambda dados: estatisticas.put(dict(dados, worker=indice)),
+        contatos=contatos,
+        stats_porta=None if stats_porta is None else stats_porta + indice,
+        **opcoes
+    )
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+
+
+class MultiWorkerServer:
+    """Servidor HuntCin em N processos (python main.py server --workers N).
+
+    Cada worker abre seu próprio socket na mesma porta com SO_REUSEPORT e tem
+    seu ConnectionManager, salas e RDTs. O kernel escolhe o socket pelo hash do
+    endereço de origem, então um cliente fala sempre com o mesmo worker (enquanto
+    o número de workers não muda). O processo pai só supervisiona: reinicia quem
+    morre e soma as estatísticas que os workers enviam.
+    """
+
+    def __init__(self, workers, assincrono=False, contatos="contatos.txt", stats_porta=None, io=UDP_IO):
+        self.qtd_workers = workers
+        self.assincrono = assincrono
+        self.contatos = contatos
+        self.stats_porta = stats_porta
+        self.io = io
+        self.estatisticas = multiprocessing.Queue()
+        self.processos = {}  # índice -> Process
+        self.ultimas = {}    # índice -> último relatório do worker
+
+    @staticmethod
+    def suportado():
+        # Só no Linux o SO_REUSEPORT distribui os datagramas UDP entre os sockets; no
+        # macOS e nos BSDs um único socket recebe tudo e os outros workers ficariam parados
+        return sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+
+    def _iniciar_worker(self, indice):
+        processo = multiprocessing.Process(
+            target=_executar_worker,
+            args=(indice, self.assincrono, self.estatisticas, self.contatos, self.stats_porta, self.io),
+            name=f"huntcin-worker-{indice}",
+            daemon=True,
+        )
+        processo.start()
+        self.processos[indice] = processo
+        print(f"👷 Worker {indice} iniciado (PID: {processo.pid})")
+
+    def run(self):
+        """Inicia os workers e fica supervisionando até Ctrl+C, SIGTERM ou SIGHUP"""
+        print(f"🎮 Servidor HuntCin UDP com {self.qtd_workers} workers em {SERVER_HOST}:{SERVER_PORT}")
+        self._instalar_sinais()
+        proximo_resumo = time.monotonic() + WORKER_STATS_INTERVAL
+        try:
+            for indice in range(self.qtd_workers):
+                self._iniciar_worker(indice)
+
+            while True:
+                try:
+                    dados = self.estatisticas.get(timeout=1.0)
+                    self.ultimas[dados['worker']] = dados
+                except queue.Empty:
+                    pass
+
+                self._supervisionar()
+
+                if time.monotonic() >= proximo_resumo:
+                    self._imprimir_resumo()
+                    proximo_resumo = time.monotonic() + WORKER_STATS_INTERVAL
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.encerrar()
+
+    def _instalar_sinais(self):
+        """SIGTERM/SIGHUP saem pelo mesmo caminho do Ctrl+C, que encerra os workers;
+        sem isso eles ficariam órfãos, presos à porta"""
+        def ao_sinal(numero, quadro):
+            raise SystemExit(128 + numero)
+
+        for sinal in _SINAIS_ENCERRAR:
+            signal.signal(sinal, ao_sinal)
+
+    def _supervisionar(self):
+        """Reinicia workers que morreram (os jogadores deles precisam logar de novo)"""
+        for indice, processo in list(self.processos.items()):
+            if processo.is_alive():
+                continue
+            print(f"❌ Worker {indice} (PID: {processo.pid}) terminou com código {processo.exitcode}, reiniciando")
+            self.ultimas.pop(indice, None)
+            self._iniciar_worker(indice)
+
+    def agregado(self):
+        """Soma dos últimos contadores de cada worker"""
+        total = {'workers': len(self.ultimas), 'jogadores': 0, 'salas': 0, 'partidas': 0, 'rdts': 0}
+        for dados in self.ultimas.values():
+            for chave in ('jogadores', 'salas', 'partidas', 'rdts'):
+                total[chave] += dados.get(chave, 0)
+        return total
+
+    def _imprimir_resumo(self):
+        if not self.ultimas:
+            return
+        total = self.agregado()
+        print(
+            f"📊 {total['workers']}/{self.qtd_workers} workers | {total['jogadores']} jogadores | "
+            f"{total['salas']} salas ({total['partidas']} em jogo)"
+        )
+
+    def encerrar(self):
+        # Um segundo sinal no meio do encerramento não pode interromper os joins
+        for sinal in _SINAIS_ENCERRAR:
+            signal.signal(sinal, signal.SIG_IGN)
+        for processo in self.processos.values():
+            if processo.is_alive():
+                processo.terminate()
+        for processo in self.processos.values():
+            processo.join(timeout=2)
+            if processo.is_alive():
+                processo.kill()
+                processo.join()
@@ -1,4 +1,5 @@
 # services/__init__.py
 from .game_services import GameService
+from .room_manager import RoomManager, Sala
 
-__all__ = ['GameService']
\ No newline at end of file
+__all__ = ['GameService', 'RoomManager', 'Sala']
\ No newline at end of file
@@ -1,25 +1,74 @@
 # services/game_services.py
 import time
 import os
-from models.game import Game
+from collections import OrderedDict
+from models.game import Game, MOVIMENTOS
+from network import protocol
+from utils.agendador import Agendador
+from utils.config import GRID_WIDTH, GRID_HEIGHT, ROUND_MODE
+
+# Quantas versões do estado ficam guardadas para calcular deltas; clientes mais
+# atrasados que isso recebem o estado completo
+HISTORICO_ESTADO = 32
+# Grids maiores que isso não são desenhados no console a cada rodada
+MAPA_CONSOLE_MAX = 40
 
 class GameService:
-    def __init__(self, connection_manager):
+    def __init__(self, connection_manager, agendar=None, largura=GRID_WIDTH, altura=GRID_HEIGHT):
         self.game = None
+        self.largura = largura
+        self.altura = altura
         self.connection_manager = connection_manager
         self.jogo_iniciado = False
         self.rodada_atual = 0
         self.turno_timeout = 10
         self.deadline_turno = None
+        self._timer_turno = None
         self.comandos_rodada = set()
+        # ROUND_MODE "lote": movimentos guardados e resolvidos juntos no fim da rodada
+        self.modo_rodada = ROUND_MODE
+        self.movimentos_rodada = []  # [(player, comando)] na ordem de chegada
         self.pausa_pos_vitoria = False
+        # Estado versionado: versão -> {nome: (x, y, hint_used, suggest_used, score)}
+        self.versao_estado = 0
+        self.historico_estado = OrderedDict({0: {}})
+        self.versoes_enviadas = {}  # nome -> versão do estado que o jogador já tem
+        # agendar(atraso, callback) -> timer com cancel(): o servidor síncrono passa
+        # Agendador.agendar e o asyncio, loop.call_later. Sem nenhum, quem usa o
+        # serviço chama self.agendador.executar_vencidos() no seu loop.
+        self.agendador = None
+        if agendar is None:
+            self.agendador = Agendador()
+            agendar = self.agendador.agendar
+        self.agendar = agendar
+    
+    def _armar_timer_turno(self):
+        """Agenda o fim do turno atual no deadline"""
+        self._cancelar_timer_turno()
+        deadline = self.deadline_turno
+        self._timer_turno = self.agendar(
+            max(0.0, deadline - time.time()), lambda: self._expirar_turno(deadline)
+        )
+    
+    def _cancelar_timer_turno(self):
+        if self._timer_turno is not None:
+            self._timer_turno.cancel()
+            self._timer_turno = None
+    
+    def _expirar_turno(self, deadline):
+        if self.deadline_turno != deadline:
+            return  # a rodada já foi fechada
+        self._timer_turno = None
+        if not self.tratar_timeout_turno() and self.deadline_turno == deadline:
+            # O timer pode vencer um pouco antes do deadline (relógios diferentes)
+            self._timer_turno = self.agendar(0.01, lambda: self._expirar_turno(deadline))
     
     def iniciar_jogo(self):
         """Inicia o jogo quando há jogadores suficientes"""
-        if self.connection_manager.get_qtd_jogadores() >= 2 and not self.jogo_iniciado:
+        if self.connection_manager.get_qtd_jogadores() >= 2 and not self.jogo_iniciado and not self.pausa_pos_vitoria:
             print(f"\n🎮 INICIANDO JOGO com {self.connection_manager.get_qtd_jogadores()} jogadores!")
             
-            self.game = Game()
+            self.game = Game(self.largura, self.altura)
             
             for nome, conn in self.connection_manager.connections.items():
                 player = conn['player']
@@ -38,37 +87,75 @@ class GameService:
         return False
     
     def enviar_para_todos(self, mensagem):
-        """Envia mensagem para todos os jogadores"""
+        """Envia mensagem (texto ou network.protocol) para todos os jogadores"""
         self.connection_manager.broadcast(mensagem)
     
     def enviar_para_jogador(self, nome, mensagem):
         """Envia mensagem para um jogador específico"""
-        conn = self.connection_manager.get_conexao(nome)
-        if conn:
-            try:
-                conn['rdt'].send(mensagem.encode())
-                return True
-            except:
-                pass
-        return False
+        try:
+            return self.connection_manager.enviar(nome, mensagem)
+        except:
+            return False
+    
+    def _atualizar_estado(self):
+        """Registra uma nova versão do estado se algo mudou e retorna o estado atual"""
+        atual = {}
+        for p in self.game.jogadores:
+            x, y = self.game.para_humano(p.pos)
+            atual[p.nome] = (x, y, p.hint_used, p.suggest_used, p.score)
+        
+        if atual != self.historico_estado[self.versao_estado]:
+            self.versao_estado += 1
+            self.historico_estado[self.versao_estado] = atual
+            while len(self.historico_estado) > HISTORICO_ESTADO:
+                self.historico_estado.popitem(last=False)
+        return atual
+    
+    def _mensagem_estado(self, base, atual):
+        """Delta da versão `base` até a atual (ou snapshot se `base` já saiu do histórico)"""
+        anterior = self.historico_estado.get(base)
+        if anterior is None:
+            return protocol.snapshot(self.versao_estado, [(nome,) + campos for nome, campos in atual.items()])
+        
+        mudaram = [(nome,) + campos for nome, campos in atual.items() if anterior.get(nome) != campos]
+        removidos = [nome for nome in anterior if nome not in atual]
+        return protocol.delta(base, self.versao_estado, mudaram, removidos)
     
     def enviar_estado_atual(self):
-        """Envia estado atual do grid para todos"""
+        """Envia estado atual do grid para todos.
+
+        Clientes do protocolo binário recebem só o que mudou desde a versão que
+        já têm; os de texto recebem o estado completo.
+        """
         if not self.game or not self.game.jogadores:
             return
         
-        def interno_para_humano(i, j):
-            return (j + 1, 3 - i)
-        
-        estado = "[Servidor] Estado atual: "
-        jogadores_info = []
+        atual = self._atualizar_estado()
+        completo = None
+        deltas = {}  # versão base -> mensagem (a maioria dos jogadores compartilha a base)
         
-        for p in self.game.jogadores:
-            x, y = interno_para_humano(*p.pos)
-            jogadores_info.append(f"{p.nome}({x},{y})")
+        for nome, conn in list(self.connection_manager.connections.items()):
+            if not conn.get('binario'):
+                if completo is None:
+                    completo = protocol.estado([(n, x, y) for n, (x, y, *_) in atual.items()])
+                self.enviar_para_jogador(nome, completo)
+                continue
+            
+            base = self.versoes_enviadas.get(nome, 0)
+            if base not in deltas:
+                deltas[base] = self._mensagem_estado(base, atual)
+            if self.enviar_para_jogador(nome, deltas[base]):
+                self.versoes_enviadas[nome] = self.versao_estado
+    
+    def enviar_snapshot(self, nome):
+        """Reenvia o estado completo para um jogador (pedido de resync)"""
+        if not self.game or not self.game.jogadores:
+            return
         
-        estado += ", ".join(jogadores_info)
-        self.enviar_para_todos(estado)
+        atual = self._atualizar_estado()
+        # Base fora do histórico força o snapshot
+        if self.enviar_para_jogador(nome, self._mensagem_estado(-1, atual)):
+            self.versoes_enviadas[nome] = self.versao_estado
     
     def iniciar_rodada(self):
         """Inicia uma nova rodada do jogo"""
@@ -76,45 +163,37 @@ class GameService:
             return
         
         self.comandos_rodada = set()
+        self.movimentos_rodada = []
         self.deadline_turno = time.time() + self.turno_timeout
+        self._armar_timer_turno()
         
         self._print_mapa_console()
         
-        broadcast_inicio = (
-            f"\n🔔 RODADA {self.rodada_atual + 1} iniciada! "
-            f"Envie seu comando em até {self.turno_timeout}s."
-        )
+        broadcast_inicio = protocol.rodada(self.rodada_atual + 1, self.turno_timeout)
         self.enviar_para_todos(broadcast_inicio)
 
         for jogador in self.game.jogadores:
-            def interno_para_humano(i, j):
-                return (j + 1, 3 - i)
-            x, y = interno_para_humano(*jogador.pos)
+            x, y = self.game.para_humano(jogador.pos)
             
-            msg = f"\n🔔 RODADA {self.rodada_atual + 1} iniciada!"
-            msg += f"\n🎯 SUA VEZ!"
-            msg += f"\n📍 Sua posição: ({x},{y})"
-            msg += "\n🎮 Comandos: move up | move down | move left | move right | hint | suggest | logout"
-            msg += f"\nHint: {'já usado' if jogador.hint_used else 'disponível (1 uso)'}"
-            msg += f"\nSuggest: {'já usado' if jogador.suggest_used else 'disponível (1 uso)'}"
-            msg += f"\n\n⏰ Você tem {self.turno_timeout} segundos!"
-            msg += f"\n> Digite seu comando:"
+            msg = protocol.sua_vez(
+                self.rodada_atual + 1, x, y, jogador.hint_used, jogador.suggest_used, self.turno_timeout
+            )
             
             self.enviar_para_jogador(jogador.nome, msg)
             
             print(f"DEBUG: Turno enviado para {jogador.nome} pos=({x},{y})")
         
         print(f"Rodada {self.rodada_atual + 1}: comandos abertos para todos")
-        time.sleep(0.5)  # Sincronização
     
     def processar_comando(self, jogador_nome, comando):
-        """Processa comando do jogador (rodada simultânea)."""
+        """Processa comando do jogador (rodada simultânea).
+        A resposta é None quando um movimento registrado fecha a rodada (o resultado já foi enviado)."""
         if not self.jogo_iniciado or not self.game:
             return False, "Jogo não iniciado", False
         if self.pausa_pos_vitoria:
             return False, "Partida encerrada. Aguardando reinício...", False
         
-        jogador = next((p for p in self.game.jogadores if p.nome == jogador_nome), None)
+        jogador = self.game.get_jogador(jogador_nome)
         if not jogador:
             return False, "Jogador não encontrado", False
         
@@ -125,13 +204,19 @@ class GameService:
         if jogador_nome in self.comandos_rodada:
             return False, "⚠️ Você já enviou comando nesta rodada.", False
         
-        encontrou_tesouro, resposta = self.game.comando(jogador, comando)
+        registrado = self.modo_rodada == "lote" and comando in MOVIMENTOS
+        if registrado:
+            self.movimentos_rodada.append((jogador, comando))
+            encontrou_tesouro, resposta = False, "⏳ Movimento registrado. Resultado no fim da rodada."
+        else:
+            encontrou_tesouro, resposta = self.game.comando(jogador, comando)
         self.comandos_rodada.add(jogador_nome)
 
         if len(self.comandos_rodada) == len(self.game.jogadores):
-            self.rodada_atual += 1
-            self.enviar_estado_atual()
-            self.iniciar_rodada()
+            self._encerrar_rodada()
+            if registrado:
+                # O resultado do movimento já saiu junto com o fim da rodada
+                resposta = None
 
         return encontrou_tesouro, resposta, True
 
@@ -147,18 +232,35 @@ class GameService:
         faltantes = [p.nome for p in self.game.jogadores if p.nome not in self.comandos_rodada]
         if faltantes:
             for nome in faltantes:
-                self.enviar_para_jogador(nome, "\n⏰ Tempo esgotado! Você perdeu o turno.")
-            self.enviar_para_todos(f"\n⏰ Jogadores sem ação: {', '.join(faltantes)}")
+                self.enviar_para_jogador(nome, protocol.tempo_esgotado())
+            self.enviar_para_todos(protocol.sem_acao(faltantes))
+        
+        self._encerrar_rodada()
+        return True
+    
+    def _encerrar_rodada(self):
+        """Resolve os movimentos guardados (modo lote) e passa para a próxima rodada"""
+        vencedor, respostas = None, []
+        if self.movimentos_rodada:
+            movimentos, self.movimentos_rodada = self.movimentos_rodada, []
+            vencedor, respostas = self.game.resolver_movimentos(movimentos)
+        for jogador, resposta in respostas:
+            self.enviar_para_jogador(jogador.nome, resposta)
         
         self.rodada_atual += 1
         self.enviar_estado_atual()
+        if vencedor is not None:
+            self.finalizar_vitoria(vencedor)
+            return
         self.iniciar_rodada()
-        return True
 
     def _print_mapa_console(self):
         """Imprime mapa atual no console do servidor."""
         if not self.game:
             return
+        if max(self.game.largura, self.game.altura) > MAPA_CONSOLE_MAX:
+            print(f"\n🗺️ Grid {self.game.largura}x{self.game.altura} com {len(self.game.jogadores)} jogadores")
+            return
         mapa = self.game.gerar_mapa()
         print("\n" + "="*20 + " MAPA ATUAL " + "="*20)
         for linha in mapa:
@@ -170,25 +272,24 @@ class GameService:
         self.pausa_pos_vitoria = True
         self.jogo_iniciado = False
         self.deadline_turno = None
+        self._cancelar_timer_turno()
 
         jogador_vencedor.score += 1
-        ti, tj = self.game.tesouro
-        x, y = (tj + 1, 3 - ti)
-        mensagem_fim = (
-            f"\nO jogador {jogador_vencedor.nome}:{jogador_vencedor.addr[1]} encontrou o tesouro na posição ({x},{y})!"
-            f"\n🎉 {jogador_vencedor.nome.upper()} É O VENCEDOR!"
-            f"\n⏳ Reiniciando em 30 segundos..."
-        )
+        x, y = self.game.para_humano(self.game.tesouro)
+        mensagem_fim = protocol.vitoria(jogador_vencedor.nome, jogador_vencedor.addr[1], x, y)
         self.enviar_para_todos(mensagem_fim)
         self.enviar_placar()
         
-        time.sleep(30)
+        self.agendar(30, self.reiniciar_partida)
 
+    def reiniciar_partida(self):
+        """Sorteia novo tesouro e recomeça com os jogadores conectados."""
         if self.connection_manager.get_qtd_jogadores() >= 2:
-            self.game = Game()
+            self.game = Game(self.largura, self.altura)
             for _, conn in self.connection_manager.connections.items():
                 player = conn['player']
                 self.game.add_player(player)
+            self.jogo_iniciado = True
             self.rodada_atual = 0
             self.deadline_turno = None
             self.pausa_pos_vitoria = False
@@ -204,14 +305,16 @@ class GameService:
         """Envia placar atual para todos."""
         if not self.game:
             return
-        placar = "🏆 Placar: " + ", ".join([f"{p.nome}={p.score}" for p in self.game.jogadores])
+        placar = protocol.placar([(p.nome, p.score) for p in self.game.jogadores])
         self.enviar_para_todos(placar)
 
     def remover_jogador(self, nome):
         """Remove jogador do game e ajusta rodada."""
+        self.versoes_enviadas.pop(nome, None)
         if not self.game:
             return
-        self.game.jogadores = [p for p in self.game.jogadores if p.nome != nome]
+        self.game.remover_jogador(nome)
+        self.movimentos_rodada = [(p, c) for p, c in self.movimentos_rodada if p.nome != nome]
         if nome in self.comandos_rodada:
             self.comandos_rodada.discard(nome)
         if self.rodada_atual >= len(self.game.jogadores):
@@ -220,4 +323,5 @@ class GameService:
             self.enviar_para_todos("\n⚠️ Jogadores insuficientes. Jogo pausado.")
             self.jogo_iniciado = False
             self.deadline_turno = None
+            self._cancelar_timer_turno()
             self.game = None
\ No newline at end of file
@@ -0,0 +1,135 @@
+# services/room_manager.py
+import itertools
+from collections import OrderedDict
+from .game_services import GameService
+
+
+class Sala:
+    """Visão do ConnectionManager restrita aos membros de uma sala.
+
+    Tem a mesma interface que o GameService usa (connections, enviar, broadcast,
+    get_qtd_jogadores), então cada sala roda seu próprio GameService sem saber
+    das outras e os broadcasts só chegam a quem está nela.
+    """
+
+    def __init__(self, sala_id, connection_manager, agendar=None, publica=False):
+        self.id = sala_id
+        self.publica = publica  # criada pelo servidor: recebe quem entra sem escolher sala
+        self.connection_manager = connection_manager
+        self.membros = OrderedDict()  # nome -> None (conjunto com ordem de entrada)
+        self.game_service = GameService(self, agendar=agendar)
+
+    @property
+    def connections(self):
+        conexoes = self.connection_manager.connections
+        return {nome: conexoes[nome] for nome in self.membros if nome in conexoes}
+
+    def get_qtd_jogadores(self):
+        return len(self.connections)
+
+    def enviar(self, nome, mensagem):
+        if nome not in self.membros:
+            return False
+        return self.connection_manager.enviar(nome, mensagem)
+
+    def broadcast(self, mensagem, excluir=None):
+        return self.connection_manager.broadcast(mensagem, excluir=excluir, nomes=self.membros)
+
+    def is_cheia(self, limite):
+        return limite is not None and len(self.membros) >= limite
+
+    def is_aguardando(self):
+        """Sala sem partida em andamento (quem entra joga já na próxima)"""
+        servico = self.game_service
+        return not servico.jogo_iniciado and not servico.pausa_pos_vitoria
+
+
+class RoomManager:
+    """Salas independentes (cada uma com seu Game e suas rodadas) num só servidor.
+
+    Jogadores entram numa sala escolhida ("login <nome> <sala>" ou "join <sala>")
+    ou, sem escolha, na primeira sala pública que ainda está esperando jogadores.
+    Salas com nome escolhido só recebem quem pede por elas. Salas vazias são descartadas.
+    """
+
+    def __init__(self, connection_manager, agendar=None, max_jogadores=None):
+        self.connection_manager = connection_manager
+        self.agendar = agendar
+        self.max_jogadores = max_jogadores
+        self.salas = {}          # id -> Sala
+        self.sala_de = {}        # nome -> id da sala do jogador
+        # Candidatas para quem entra sem escolher sala; as que começam a partida
+        # ou enchem saem daqui e voltam quando alguém sai delas
+        self._abertas = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def get_sala(self, sala_id):
+        return self.salas.get(sala_id)
+
+    def sala_do_jogador(self, nome):
+        sala_id = self.sala_de.get(nome)
+        return self.salas.get(sala_id) if sala_id is not None else None
+
+    def service(self, nome):
+        """GameService da sala do jogador (None se ele não está em nenhuma)"""
+        sala = self.sala_do_jogador(nome)
+        return sala.game_service if sala else None
+
+    def _criar_sala(self, sala_id=None):
+        publica = sala_id is None
+        if publica:
+            sala_id = str(next(self._ids))
+            while sala_id in self.salas:
+                sala_id = str(next(self._ids))
+        sala = Sala(sala_id, self.connection_manager, agendar=self.agendar, publica=publica)
+        self.salas[sala_id] = sala
+        if publica:
+            self._abertas[sala_id] = None
+        return sala
+
+    def _sala_livre(self):
+        """Primeira sala esperando jogadores e com vaga (ou uma nova)"""
+        for sala_id in list(self._abertas):
+            sala = self.salas.get(sala_id)
+            if sala is None or sala.is_cheia(self.max_jogadores) or sala.game_service.jogo_iniciado:
+                del self._abertas[sala_id]
+                continue
+            if sala.is_aguardando():
+                return sala
+        return self._criar_sala()
+
+    def entrar(self, nome, sala_id=None):
+        """Coloca o jogador numa sala (saindo da atual); retorna (Sala, None) ou (None, erro)"""
+        atual = self.sala_do_jogador(nome)
+        if sala_id is None:
+            if atual is not None:
+                return atual, None
+            sala = self._sala_livre()
+        else:
+            sala = self.salas.get(sala_id)
+            if sala is atual and sala is not None:
+                return sala, None
+            if sala is None:
+                sala = self._criar_sala(sala_id)
+            elif sala.is_cheia(self.max_jogadores):
+                return None, f"Sala '{sala_id}' cheia ({self.max_jogadores} jogadores)"
+
+        if atual is not None:
+            self.sair(nome)
+        sala.membros[nome] = None
+        self.sala_de[nome] = sala.id
+        return sala, None
+
+    def sair(self, nome):
+        """Tira o jogador da sua sala (e do jogo dela); descarta a sala se ficou vazia"""
+        sala_id = self.sala_de.pop(nome, None)
+        sala = self.salas.get(sala_id)
+        if sala is None:
+            return
+        sala.game_service.remover_jogador(nome)
+        sala.membros.pop(nome, None)
+        if not sala.membros:
+            del self.salas[sala_id]
+            self._abertas.pop(sala_id, None)
+        elif sala.publica:
+            self._abertas[sala_id] = None
@@ -0,0 +1,61 @@
+# utils/agendador.py
+import heapq
+import itertools
+import logging
+import time
+
+
+class Timer:
+    """Evento agendado; cancel() impede a execução (mesma interface do asyncio.TimerHandle)"""
+
+    __slots__ = ("quando", "callback", "args", "cancelado")
+
+    def __init__(self, quando, callback, args):
+        self.quando = quando
+        self.callback = callback
+        self.args = args
+        self.cancelado = False
+
+    def cancel(self):
+        self.cancelado = True
+
+
+class Agendador:
+    """Timers em heap para o loop do servidor síncrono.
+
+    Ninguém dorme: o loop usa proximo_prazo() como timeout da leitura do
+    socket e chama executar_vencidos() a cada volta, então os pacotes
+    continuam sendo processados enquanto os eventos do jogo esperam a hora.
+    """
+
+    def __init__(self, relogio=time.monotonic):
+        self.relogio = relogio
+        self._heap = []  # (quando, ordem, Timer)
+        self._ordem = itertools.count()
+
+    def agendar(self, atraso, callback, *args):
+        """Executa callback(*args) daqui a `atraso` segundos; retorna o Timer"""
+        timer = Timer(self.relogio() + atraso, callback, args)
+        heapq.heappush(self._heap, (timer.quando, next(self._ordem), timer))
+        return timer
+
+    def proximo_prazo(self):
+        """Segundos até o próximo evento (None se não há nenhum)"""
+        while self._heap and self._heap[0][2].cancelado:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.relogio())
+
+    def executar_vencidos(self):
+        """Executa, em ordem, os eventos cujo horário já chegou. A exceção de um
+        evento é registrada no log e não impede os outros (como no asyncio)"""
+        agora = self.relogio()
+        while self._heap and self._heap[0][0] <= agora:
+            _, _, timer = heapq.heappop(self._heap)
+            if timer.cancelado:
+                continue
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logging.exception(f"[Agendador] Erro no evento {timer.callback!r}")
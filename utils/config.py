@@ -4,6 +4,70 @@ import os
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 12345
 BUFFER_SIZE = 1024
+# Maior mensagem aceita pelo RDT; acima de BUFFER_SIZE ela é fragmentada
+MAX_MESSAGE_SIZE = 1024 * 1024
 END_SIGNAL = b"__END__"
 TIMEOUT = 2.0
-LOSS_PROBABILITY = 0.0 
\ No newline at end of file
+LOSS_PROBABILITY = 0.0 
+
+# Dimensões do grid do jogo (colunas x linhas); o tesouro nunca nasce em (1,1)
+GRID_WIDTH = 3
+GRID_HEIGHT = 3
+
+# Resolução dos movimentos: "imediato" (cada comando é aplicado ao chegar) ou "lote"
+# (guardados e resolvidos juntos no fim da rodada; empate no tesouro vai para quem
+# mandou primeiro). Com NumPy instalado o lote é resolvido numa passada vetorizada.
+ROUND_MODE = "imediato"
+
+# Modo de transferência do RDT: "stop_and_wait" (padrão) ou "janela" (Selective Repeat)
+RDT_MODE = "stop_and_wait"
+RDT_WINDOW_SIZE = 8
+
+# Retransmissão adaptativa: TIMEOUT é o RTO inicial, ajustado pelo RTT medido.
+# O backoff não passa de RTO_MAX, então um peer que sumiu segura um send() no
+# máximo 10 tentativas x RTO_MAX (20 s, o mesmo do timeout fixo antigo)
+RTO_MIN = 0.005
+RTO_MAX = TIMEOUT
+
+# Keepalive: o cliente manda heartbeat a cada HEARTBEAT_INTERVAL segundos e o
+# servidor remove quem manda heartbeats mas está calado há mais de IDLE_TIMEOUT
+HEARTBEAT_INTERVAL = 2.0
+IDLE_TIMEOUT = 6.0
+
+# Salas: cada uma tem seu próprio jogo e rodadas. Quem entra sem escolher sala vai
+# para a primeira que ainda espera jogadores; None deixa as salas sem limite.
+ROOM_MAX_PLAYERS = 4
+
+# Modo --workers: a cada WORKER_STATS_INTERVAL segundos cada processo manda seus
+# contadores ao supervisor, que mostra o total
+WORKER_STATS_INTERVAL = 5.0
+
+# Página de métricas (contadores por peer, formato de texto do Prometheus) em
+# http://127.0.0.1:STATS_PORT/metrics; None desliga. No modo --workers cada
+# worker usa STATS_PORT + índice.
+STATS_PORT = None
+
+# Gravador de voo: quantos eventos de pacote (envio, ACK, perda, duplicado, ...) o
+# RDT guarda em memória para despejar depois (kill -USR1 <pid> ou /eventos na
+# página de métricas)
+FLIGHT_RECORDER_SIZE = 8192
+
+# E/S de datagramas do servidor síncrono: "simples" (um recvfrom/sendto por datagrama)
+# ou "lote" (recvmmsg/sendmmsg no Linux, laço de recvfrom/sendto nos outros sistemas):
+# o socket é lido IO_BATCH_SIZE datagramas por vez, os já recebidos são atendidos no
+# mesmo tick e os ACKs e broadcasts saem juntos uma vez por iteração do loop
+UDP_IO = "simples"
+IO_BATCH_SIZE = 64
+
+# Formato dos logs; configurado por quem executa (main.py, servidores e cliente),
+# nunca na importação dos módulos de rede
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Checksum dos pacotes: "crc32", "adler32" ou "md5". O algoritmo vai no cabeçalho
+# de cada pacote e o RDT responde no formato que o peer usou; "legado" envia o
+# formato antigo (seq de 1 byte + MD5) para falar com servidores/clientes antigos.
+RDT_CHECKSUM = "crc32"
+
+# Formato das mensagens do jogo enviado pelo cliente: "binario" (opcode + campos,
+# network/protocol.py) ou "texto". O servidor responde no formato do login.
+MESSAGE_PROTOCOL = "binario"
@@ -1,12 +1,17 @@
 # utils/position_utils.py
-def humano_para_interno(x, y):
+# Coordenadas humanas (x, y): x é a coluna (1 = esquerda) e y a linha (1 = embaixo).
+# Coordenadas internas (i, j): linha e coluna da matriz, com i = 0 no topo.
+# Todo o código converte por aqui; `altura` é o número de linhas do grid.
+from .config import GRID_WIDTH, GRID_HEIGHT
+
+def humano_para_interno(x, y, altura=GRID_HEIGHT):
     """Converte coordenadas normais para internas"""
-    return (3 - y, x - 1)
+    return (altura - y, x - 1)
 
-def interno_para_humano(i, j):
+def interno_para_humano(i, j, altura=GRID_HEIGHT):
     """Converte coordenadas internas para normais"""
-    return (j + 1, 3 - i)
+    return (j + 1, altura - i)
 
-def validar_posicao(x, y):
+def validar_posicao(x, y, largura=GRID_WIDTH, altura=GRID_HEIGHT):
     """Valida se posição está dentro do mapa"""
-    return 1 <= x <= 3 and 1 <= y <= 3
\ No newline at end of file
+    return 1 <= x <= largura and 1 <= y <= altura